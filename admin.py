@@ -1,9 +1,15 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, Response, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
+import hmac
 import os
-import markdown
 from database import *
+from jobs import enqueue
+from storage import store_upload
+from uploads import (
+    UPLOAD_CHUNK_SIZE, UploadError, append_chunk, cancel_upload, complete_upload, create_upload, upload_status,
+)
+from metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus, summary as metrics_summary
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -12,19 +18,24 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 ADMIN_USERNAME = os.environ.get('ADMIN_USERNAME', 'admin')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'password123')  # Change this!
 
-# Use absolute paths for upload folders (critical for PythonAnywhere)
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'images', 'projects')
-README_FOLDER = os.path.join(BASE_DIR, 'static', 'readme')
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
-# Ensure upload directories exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(README_FOLDER, exist_ok=True)
-
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def read_readme_upload():
+    """Markdown text of an uploaded README.md, or None"""
+    file = request.files.get('readme')
+    if file and file.filename.endswith('.md'):
+        return file.read().decode('utf-8', errors='replace')
+    return None
+
+def uploaded_images(field):
+    """Blob paths of finished chunked uploads listed in a form field (anything else is ignored)"""
+    paths = split_list(request.form.get(field))
+    known = get_known_blobs(paths)
+    return [path for path in paths if path in known]
+
 def login_required(f):
     """Decorator to require login for admin routes"""
     from functools import wraps
@@ -63,8 +74,29 @@ def logout():
 @login_required
 def dashboard():
     """Admin dashboard"""
-    projects = get_all_projects()
-    return render_template('admin/dashboard.html', projects=projects)
+    from flask import current_app
+    from jobs import get_job_counts
+    projects, next_cursor, prev_cursor = get_projects_page(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        limit=current_app.config.get('PROJECTS_PER_PAGE', PROJECTS_PER_PAGE),
+    )
+    return render_template('admin/dashboard.html', projects=projects, total_projects=count_projects(),
+                           next_cursor=next_cursor, prev_cursor=prev_cursor, job_counts=get_job_counts(),
+                           categories=get_category_choices(), endpoint_metrics=metrics_summary())
+
+@admin_bp.route('/metrics')
+def metrics():
+    """Request metrics in the Prometheus text format (admin session or bearer token)"""
+    token = os.environ.get('METRICS_TOKEN')
+    auth = request.headers.get('Authorization', '')
+    bearer_ok = bool(token) and auth.startswith('Bearer ') and hmac.compare_digest(auth[7:], token)
+    if not (session.get('admin_logged_in') or bearer_ok):
+        return Response('Unauthorized\n', status=401, mimetype='text/plain',
+                        headers={'WWW-Authenticate': 'Bearer'})
+    response = Response(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 def get_category_choices():
     """Helper function to get category choices for forms"""
@@ -85,46 +117,35 @@ def new_project():
         github_url = request.form.get('github_url', '')
         featured = 1 if request.form.get('featured') else 0
         
-        # Handle README.md upload
-        readme_path = ''
-        if 'readme' in request.files:
-            file = request.files['readme']
-            if file and file.filename.endswith('.md'):
-                filename = secure_filename(f"{title.replace(' ', '_')}_README.md")
-                filepath = os.path.join(README_FOLDER, filename)
-                file.save(filepath)
-                readme_path = f'readme/{filename}'
-                
-                # Read and convert markdown to HTML
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    md_content = f.read()
-                    full_description = markdown.markdown(md_content, extensions=['extra', 'codehilite', 'fenced_code'])
+        # Handle README.md upload (the markdown is kept; rendering happens in the background)
+        readme_markdown = read_readme_upload()
         
-        # Handle main image upload
-        image_url = ''
+        # Handle main image upload (already stored if it came through /admin/uploads)
+        image_url = (uploaded_images('uploaded_image') or [''])[0]
         if 'image' in request.files:
             file = request.files['image']
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                file.save(filepath)
-                image_url = f'projects/{filename}'
+                image_url = store_upload(file)
         
         # Handle multiple screenshots
-        screenshots = []
+        screenshots = uploaded_images('uploaded_screenshots')
         if 'screenshots' in request.files:
             files = request.files.getlist('screenshots')
             for file in files:
                 if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    filepath = os.path.join(UPLOAD_FOLDER, filename)
-                    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                    file.save(filepath)
-                    screenshots.append(f'projects/{filename}')
+                    screenshots.append(store_upload(file))
         
         screenshots_str = ','.join(screenshots)
-        add_project(title, category, description, technologies, image_url, project_url, github_url, featured, full_description, screenshots_str)
+        
+        # Derivatives and README rendering happen in the background
+        images = [path for path in [image_url] + screenshots if path]
+        needs_processing = bool(images or readme_markdown)
+        project_id = add_project(title, category, description, technologies, image_url, project_url, github_url, featured, full_description, screenshots_str,
+                                 processing_status='pending' if needs_processing else 'ready')
+        if readme_markdown:
+            set_project_markdown(project_id, readme_markdown)
+        if needs_processing:
+            enqueue('process_project', project_id=project_id, images=images, render_markdown=bool(readme_markdown))
         flash('Project added successfully!', 'success')
         return redirect(url_for('admin.dashboard'))
     
@@ -147,52 +168,80 @@ def edit_project(project_id):
         github_url = request.form.get('github_url', '')
         featured = 1 if request.form.get('featured') else 0
         
-        # Handle README.md upload
-        if 'readme' in request.files:
-            file = request.files['readme']
-            if file and file.filename.endswith('.md'):
-                filename = secure_filename(f"{title.replace(' ', '_')}_README.md")
-                filepath = os.path.join(README_FOLDER, filename)
-                file.save(filepath)
-                
-                # Read and convert markdown to HTML
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    md_content = f.read()
-                    full_description = markdown.markdown(md_content, extensions=['extra', 'codehilite', 'fenced_code'])
+        # Handle README.md upload (the markdown is kept; rendering happens in the background)
+        readme_markdown = read_readme_upload()
         
-        # Handle main image upload
-        image_url = project['image_url']
+        # Handle main image upload (already stored if it came through /admin/uploads)
+        new_images = uploaded_images('uploaded_image')[:1]
+        image_url = new_images[0] if new_images else project['image_url']
         if 'image' in request.files:
             file = request.files['image']
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                file.save(filepath)
-                image_url = f'projects/{filename}'
+                image_url = store_upload(file)
+                new_images = [image_url]
         
         # Handle multiple screenshots
         screenshots_str = project['screenshots'] if project['screenshots'] else ''
+        new_screenshots = uploaded_images('uploaded_screenshots')
         if 'screenshots' in request.files:
             files = request.files.getlist('screenshots')
-            new_screenshots = []
             for file in files:
                 if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    filepath = os.path.join(UPLOAD_FOLDER, filename)
-                    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                    file.save(filepath)
-                    new_screenshots.append(f'projects/{filename}')
+                    new_screenshots.append(store_upload(file))
             if new_screenshots:
                 screenshots_str = ','.join(new_screenshots)
+                new_images.extend(new_screenshots)
         
         update_project(project_id, title, category, description, technologies, image_url, project_url, github_url, featured, full_description, screenshots_str)
+        if readme_markdown:
+            set_project_markdown(project_id, readme_markdown)
+        elif project['readme_markdown'] and full_description.replace('\r\n', '\n') != (project['full_description'] or ''):
+            # A hand-edited description replaces the rendered README
+            set_project_markdown(project_id, None)
+        
+        # Derivatives and README rendering happen in the background
+        if new_images or readme_markdown:
+            set_project_processing_status(project_id, 'pending')
+            enqueue('process_project', project_id=project_id, images=new_images, render_markdown=bool(readme_markdown))
         flash('Project updated successfully!', 'success')
         return redirect(url_for('admin.dashboard'))
     
     categories = get_category_choices()
     return render_template('admin/project_form.html', project=project, categories=categories)
 
+@admin_bp.errorhandler(UploadError)
+def upload_error(e):
+    return jsonify({'error': str(e)}), e.status
+
+@admin_bp.route('/uploads', methods=['POST'])
+@login_required
+def start_upload():
+    """Begin a resumable chunked image upload (see uploads.py)"""
+    data = request.get_json(silent=True) or {}
+    upload_id = create_upload(data.get('filename'), data.get('size'))
+    return jsonify({'id': upload_id, 'offset': 0, 'chunk_size': UPLOAD_CHUNK_SIZE}), 201
+
+@admin_bp.route('/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+@login_required
+def upload(upload_id):
+    """Upload progress (GET), the next chunk (PUT ?offset=N) or cancel (DELETE)"""
+    if request.method == 'PUT':
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            raise UploadError(400, 'offset is required')
+        # Read the raw body as a stream; nothing is buffered whole
+        return jsonify({'offset': append_chunk(upload_id, offset, request.stream, request.content_length)})
+    if request.method == 'DELETE':
+        cancel_upload(upload_id)
+        return '', 204
+    return jsonify(upload_status(upload_id))
+
+@admin_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def finish_upload(upload_id):
+    """Store a fully received upload; returns its path for the project form"""
+    return jsonify({'path': complete_upload(upload_id)})
+
 @admin_bp.route('/project/delete/<int:project_id>')
 @login_required
 def delete_project_route(project_id):
@@ -201,6 +250,46 @@ def delete_project_route(project_id):
     flash('Project deleted successfully!', 'success')
     return redirect(url_for('admin.dashboard'))
 
+BULK_MESSAGES = {
+    'delete_projects': '{} project(s) deleted',
+    'feature_projects': '{} project(s) featured',
+    'unfeature_projects': '{} project(s) no longer featured',
+    'move_projects': '{} project(s) moved',
+    'list_categories': '{} category(ies) listed',
+    'unlist_categories': '{} category(ies) unlisted',
+    'delete_categories': '{} category(ies) deleted',
+}
+
+@admin_bp.route('/bulk', methods=['POST'])
+@login_required
+def bulk_edit():
+    """Apply several project/category edits in one transaction.
+
+    JSON: {"operations": [{"op", "ids", ...}, ...]} -> {"results": [...]}
+    (see database.apply_admin_operations). Forms (the multi-select bars)
+    send a single op, ids and, to move projects, category.
+    """
+    if request.is_json:
+        operations = (request.get_json(silent=True) or {}).get('operations')
+        if not isinstance(operations, list):
+            return jsonify({'error': 'operations must be a list'}), 400
+        try:
+            results = apply_admin_operations(operations)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'results': results})
+    
+    op = request.form.get('op', '')
+    operation = {'op': op, 'ids': request.form.getlist('ids')}
+    if request.form.get('category'):
+        operation['category'] = request.form['category']
+    try:
+        count, = apply_admin_operations([operation])
+        flash(BULK_MESSAGES.get(op, '{} updated').format(count) + '.', 'success')
+    except ValueError as e:
+        flash(str(e), 'error')
+    return redirect(url_for('admin.manage_categories') if op.endswith('_categories') else url_for('admin.dashboard'))
+
 @admin_bp.route('/categories')
 @login_required
 def manage_categories():
@@ -228,9 +317,7 @@ def toggle_category(category_id):
 @login_required
 def add_category():
     """Add a new category"""
-    from database import add_category as db_add_category, get_all_categories
-    import os
-    from werkzeug.utils import secure_filename
+    from database import add_category as db_add_category
     
     category_id = request.form.get('category_id', '').strip().lower()
     name = request.form.get('name', '').strip()
@@ -246,24 +333,12 @@ def add_category():
     icon_image = None
     if 'icon_image' in request.files:
         file = request.files['icon_image']
-        if file and file.filename:
-            filename = secure_filename(file.filename)
-            # Create category-icons directory if it doesn't exist
-            icons_dir = os.path.join('static', 'images', 'category-icons')
-            os.makedirs(icons_dir, exist_ok=True)
-            
-            # Save with category_id as filename
-            ext = os.path.splitext(filename)[1]
-            icon_filename = f"{category_id}{ext}"
-            file.save(os.path.join(icons_dir, icon_filename))
-            icon_image = f"category-icons/{icon_filename}"
-    
-    # Get max sort order
-    categories = get_all_categories()
-    max_sort = max([cat['sort_order'] for cat in categories], default=0) if categories else 0
+        if file and file.filename and allowed_file(file.filename):
+            icon_image = store_upload(file)
+            enqueue('generate_derivatives', image_path=icon_image)
     
-    # Add category
-    success = db_add_category(category_id, name, icon, color, max_sort + 1, icon_image)
+    # Add category (placed after the last one)
+    success = db_add_category(category_id, name, icon, color, icon_image=icon_image)
     
     if success:
         flash(f'Category "{name}" added successfully!', 'success')
@@ -278,12 +353,11 @@ def delete_category(category_id):
     """Delete a category"""
     from database import delete_category as db_delete_category
     
-    projects_count = db_delete_category(category_id)
-    
-    if projects_count > 0:
-        flash(f'Category deleted! {projects_count} project(s) were updated to have no category.', 'warning')
-    else:
+    try:
+        db_delete_category(category_id)
         flash('Category deleted successfully!', 'success')
+    except ValueError as e:
+        flash(str(e), 'error')
     
     return redirect(url_for('admin.manage_categories'))
 
@@ -292,8 +366,6 @@ def delete_category(category_id):
 def edit_category(category_id):
     """Edit a category"""
     from database import get_category_by_id, update_category
-    import os
-    from werkzeug.utils import secure_filename
     
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
@@ -308,15 +380,9 @@ def edit_category(category_id):
         icon_image = None
         if 'icon_image' in request.files:
             file = request.files['icon_image']
-            if file and file.filename:
-                filename = secure_filename(file.filename)
-                icons_dir = os.path.join('static', 'images', 'category-icons')
-                os.makedirs(icons_dir, exist_ok=True)
-                
-                ext = os.path.splitext(filename)[1]
-                icon_filename = f"{category_id}{ext}"
-                file.save(os.path.join(icons_dir, icon_filename))
-                icon_image = f"category-icons/{icon_filename}"
+            if file and file.filename and allowed_file(file.filename):
+                icon_image = store_upload(file)
+                enqueue('generate_derivatives', image_path=icon_image)
         
         # Update category
         success = update_category(category_id, name, icon, color, icon_image)
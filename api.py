@@ -0,0 +1,199 @@
+"""
+Read-only JSON API
+Compact JSON for front-end widgets and aggregators, so they don't have to
+scrape the HTML pages. Every endpoint goes through the page cache: a
+response is serialized once per content change and carries an ETag, and
+conditional requests are answered with 304 Not Modified.
+
+    GET /api/categories                 listed categories
+    GET /api/categories/<id>            one category
+    GET /api/projects                   in display order, keyset-paged (?after=/?before=
+                                        cursors, ?category=, ?tag=, ?limit=)
+    GET /api/projects?ids=1,2,3         several projects in one request
+    GET /api/projects/<id>              one project, including full_description
+    GET /api/tags                       technology tags with project counts
+    GET /api/search?q=                  ranked full-text search
+
+?fields=title,tags selects the fields returned for categories and projects.
+"""
+from flask import Blueprint, abort, current_app, jsonify, make_response, request, url_for
+
+from database import (
+    get_category_by_id, get_listed_categories, get_project_images, get_project_tags,
+    get_projects_by_ids, get_projects_page, get_tag_by_slug, get_tag_counts, search_projects,
+)
+from markdown_render import ensure_rendered, is_stale
+from page_cache import cached_page
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+CATEGORY_FIELDS = ('id', 'name', 'icon', 'icon_image', 'color', 'sort_order')
+PROJECT_FIELDS = (
+    'id', 'title', 'category', 'description', 'full_description', 'tags', 'image_url',
+    'screenshots', 'project_url', 'github_url', 'featured', 'created_at',
+)
+# full_description is large HTML; lists only include it when asked for
+DEFAULT_PROJECT_FIELDS = tuple(f for f in PROJECT_FIELDS if f != 'full_description')
+# Fields that aren't read from the projects table
+DERIVED_PROJECT_FIELDS = ('tags', 'screenshots')
+MAX_BATCH = 100
+
+def _error(status, message):
+    abort(make_response(jsonify({'error': message}), status))
+
+def _requested_fields(allowed, default):
+    """Fields named in ?fields=, validated against allowed"""
+    value = request.args.get('fields')
+    if not value:
+        return default
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        _error(400, f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+def _project_columns(fields):
+    """SQL column list for the requested project fields (plus what paging needs)"""
+    columns = ['id', 'sort_order']
+    columns += [f for f in fields if f not in columns and f not in DERIVED_PROJECT_FIELDS]
+    if 'full_description' in fields:
+        # To tell whether the README needs re-rendering (see _projects_json)
+        columns += ['readme_markdown', 'markdown_key']
+    return ', '.join(columns)
+
+def _image_url(path):
+    return url_for('static', filename='images/' + path) if path else None
+
+def _category_json(category, fields):
+    return {field: category[field] for field in fields}
+
+def _projects_json(projects, fields):
+    """Serialize project rows, fetching tags/screenshots for all of them at once"""
+    ids = [project['id'] for project in projects]
+    tags = get_project_tags(ids) if 'tags' in fields else {}
+    images = get_project_images(ids) if 'screenshots' in fields else {}
+
+    result = []
+    for project in projects:
+        item = {}
+        for field in fields:
+            if field == 'tags':
+                item['tags'] = [{'slug': tag['slug'], 'name': tag['name']} for tag in tags[project['id']]]
+            elif field == 'screenshots':
+                item['screenshots'] = [_image_url(path) for path in images[project['id']]]
+            elif field == 'image_url':
+                item['image_url'] = _image_url(project['image_url'])
+            elif field == 'featured':
+                item['featured'] = bool(project['featured'])
+            elif field == 'full_description' and is_stale(project):
+                # Like the project page: render a README the renderer has changed under
+                item['full_description'] = ensure_rendered(project)
+            else:
+                item[field] = project[field]
+        result.append(item)
+    return result
+
+def _parse_ids(value):
+    try:
+        ids = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        _error(400, 'ids must be a comma-separated list of integers')
+    if len(ids) > MAX_BATCH:
+        _error(400, f'At most {MAX_BATCH} ids per request')
+    return ids
+
+@api_bp.route('/categories')
+@cached_page
+def categories():
+    """Listed categories in display order"""
+    fields = _requested_fields(CATEGORY_FIELDS, CATEGORY_FIELDS)
+    return jsonify({'categories': [_category_json(c, fields) for c in get_listed_categories()]})
+
+@api_bp.route('/categories/<category_id>')
+@cached_page
+def category(category_id):
+    """A single listed category"""
+    fields = _requested_fields(CATEGORY_FIELDS, CATEGORY_FIELDS)
+    category_info = get_category_by_id(category_id)
+    if not category_info or not category_info['is_listed']:
+        _error(404, 'Category not found')
+    return jsonify(_category_json(category_info, fields))
+
+@api_bp.route('/projects')
+@cached_page
+def projects():
+    """A page of projects, or a batch by id with ?ids="""
+    fields = _requested_fields(PROJECT_FIELDS, DEFAULT_PROJECT_FIELDS)
+    columns = _project_columns(fields)
+
+    if 'ids' in request.args:
+        rows = get_projects_by_ids(_parse_ids(request.args['ids']), columns=columns)
+        return jsonify({'projects': _projects_json(rows, fields)})
+
+    category_id = request.args.get('category')
+    if category_id is not None:
+        category_info = get_category_by_id(category_id)
+        if not category_info or not category_info['is_listed']:
+            _error(404, 'Category not found')
+    tag_id = None
+    if request.args.get('tag'):
+        tag_info = get_tag_by_slug(request.args['tag'])
+        if not tag_info:
+            _error(404, 'Tag not found')
+        tag_id = tag_info['id']
+
+    default_limit = current_app.config.get('PROJECTS_PER_PAGE') or MAX_BATCH
+    limit = min(max(request.args.get('limit', default_limit, type=int), 1), MAX_BATCH)
+    rows, next_cursor, prev_cursor = get_projects_page(
+        category_id,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        limit=limit,
+        tag=tag_id,
+        listed_only=True,
+        columns=columns,
+    )
+    return jsonify({
+        'projects': _projects_json(rows, fields),
+        'next': next_cursor,
+        'prev': prev_cursor,
+    })
+
+@api_bp.route('/projects/<int:project_id>')
+@cached_page
+def project(project_id):
+    """A single project in a listed category"""
+    fields = _requested_fields(PROJECT_FIELDS, PROJECT_FIELDS)
+    rows = get_projects_by_ids([project_id], columns=_project_columns(fields))
+    if not rows:
+        _error(404, 'Project not found')
+    return jsonify(_projects_json(rows, fields)[0])
+
+@api_bp.route('/tags')
+@cached_page
+def tags():
+    """Technology tags with their number of listed projects"""
+    return jsonify({'tags': [
+        {'slug': tag['slug'], 'name': tag['name'], 'count': tag['count']}
+        for tag in get_tag_counts()
+    ]})
+
+@api_bp.route('/search')
+@cached_page
+def search():
+    """Full-text project search: ranked, highlighted and paginated"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 50)
+
+    results, total = search_projects(query, limit=per_page, offset=(page - 1) * per_page)
+    for result in results:
+        result['image_url'] = _image_url(result['image_url'])
+    return jsonify({
+        'query': query,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page,
+        'results': results,
+    })
@@ -1,8 +1,18 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, request
 import os
-from datetime import datetime
 from admin import admin_bp
-from database import get_projects_by_category, get_listed_categories, get_category_by_id, init_db, init_default_categories
+from api import api_bp
+from page_cache import cached_page, current_content_version
+from images import responsive_img
+from jobs import resume_pending_jobs
+from orphans import start_collector
+from storage import immutable_blob_headers
+from assets import init_app as init_assets
+from compression import compress_response
+from metrics import init_app as init_metrics
+from template_cache import init_app as init_template_cache
+from markdown_render import ensure_rendered, is_stale
+from database import get_projects_page, get_listed_categories, get_category_by_id, get_project_tags, get_project_images, get_tag_by_slug, get_tag_counts, init_db, close_db_connection
 
 app = Flask(__name__)
 
@@ -11,18 +21,51 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['DEBUG'] = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
+# Projects per listing page; empty, 0 or "none" turns paging off (freeze.py does the same)
+_per_page = os.environ.get('PROJECTS_PER_PAGE', '24').strip().lower()
+app.config['PROJECTS_PER_PAGE'] = None if _per_page in ('', 'none') else (int(_per_page) or None)
 
 # Register admin blueprint
 app.register_blueprint(admin_bp)
 
-# Initialize database
+# Read-only JSON API
+app.register_blueprint(api_bp)
+
+# Apply pending schema migrations (a single read when the schema is current)
 init_db()
-init_default_categories()
 
-# Context processor to inject current year into all templates
-@app.context_processor
-def inject_current_year():
-    return {'current_year': datetime.now().year}
+# Pick up background jobs left unfinished by a previous worker
+resume_pending_jobs()
+
+# Periodically delete uploads nothing references (if ORPHAN_GC_INTERVAL is set)
+start_collector()
+
+# Keep one database connection per worker thread; clean it up after each request
+app.teardown_appcontext(close_db_connection)
+
+@app.before_request
+def check_content_version():
+    """Pick up content changes made by other worker processes"""
+    if request.endpoint != 'static':
+        current_content_version()
+
+# Fingerprinted static URLs with long-lived caching
+init_assets(app)
+
+# Content-addressed uploads never change, so they can be cached forever
+app.after_request(immutable_blob_headers)
+
+# gzip/brotli for dynamic HTML and JSON
+app.after_request(compress_response)
+
+# Per-endpoint latency, size, status and query metrics (see /admin/metrics)
+init_metrics(app)
+
+# Responsive <picture>/srcset markup for uploaded images
+app.add_template_global(responsive_img)
+
+# Bytecode-cached, precompiled templates; cached layout fragments and current_year
+init_template_cache(app)
 
 # Remove hardcoded categories - now loaded from database
 
@@ -43,22 +86,26 @@ PERSONAL_INFO = {
 }
 
 @app.route('/')
+@cached_page
 def index():
     """Home page"""
     return render_template('index.html', info=PERSONAL_INFO)
 
 @app.route('/about')
+@cached_page
 def about():
     """About page"""
     return render_template('about.html', info=PERSONAL_INFO)
 
 @app.route('/portfolio')
+@cached_page
 def portfolio():
     """Portfolio page"""
     categories = get_listed_categories()
-    return render_template('portfolio.html', categories=categories, info=PERSONAL_INFO)
+    return render_template('portfolio.html', categories=categories, tag_counts=get_tag_counts(), info=PERSONAL_INFO)
 
 @app.route('/portfolio/<category>')
+@cached_page
 def portfolio_category(category):
     """Individual portfolio category page"""
     category_info = get_category_by_id(category)
@@ -69,15 +116,46 @@ def portfolio_category(category):
     if not category_info['is_listed']:
         return "Category is currently unlisted", 404
     
-    # Get projects from database
-    projects = get_projects_by_category(category)
+    # Get one page of projects from database
+    projects, next_cursor, prev_cursor = get_projects_page(
+        category,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        limit=app.config['PROJECTS_PER_PAGE'],
+    )
     
     return render_template('portfolio/category.html', 
                          category=category_info, 
                          projects=projects,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
+                         info=PERSONAL_INFO)
+
+@app.route('/portfolio/tag/<tag>')
+@cached_page
+def portfolio_tag(tag):
+    """Projects using one technology, across listed categories"""
+    tag_info = get_tag_by_slug(tag)
+    if not tag_info:
+        return "Tag not found", 404
+    
+    projects, next_cursor, prev_cursor = get_projects_page(
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        limit=app.config['PROJECTS_PER_PAGE'],
+        tag=tag_info['id'],
+        listed_only=True,
+    )
+    
+    return render_template('portfolio/tag.html',
+                         tag=tag_info,
+                         projects=projects,
+                         next_cursor=next_cursor,
+                         prev_cursor=prev_cursor,
                          info=PERSONAL_INFO)
 
 @app.route('/project/<int:project_id>')
+@cached_page
 def project_detail(project_id):
     """Individual project detail page"""
     from database import get_project_by_id
@@ -86,24 +164,26 @@ def project_detail(project_id):
     if not project:
         return "Project not found", 404
     
+    # Render the README now if the renderer changed since it was last rendered
+    if is_stale(project):
+        project = dict(project, full_description=ensure_rendered(project))
+    
     # Get category info from database
     category_info = get_category_by_id(project['category'])
     
     return render_template('portfolio/project_detail.html', 
                          project=project,
+                         tags=get_project_tags([project_id])[project_id],
+                         screenshots=get_project_images([project_id])[project_id],
                          category=category_info,
                          info=PERSONAL_INFO)
 
 @app.route('/contact')
+@cached_page
 def contact():
     """Contact page"""
     return render_template('contacts.html', info=PERSONAL_INFO)
 
-@app.route('/api/categories')
-def api_categories():
-    """API endpoint to get portfolio categories"""
-    return jsonify(PORTFOLIO_CATEGORIES)
-
 # Only run the development server when executed directly
 # PythonAnywhere will use the WSGI file instead
 if __name__ == '__main__':
@@ -0,0 +1,201 @@
+"""
+ASGI entry point
+Serves the same Flask app as wsgi.py under an ASGI server, e.g.:
+    pip install uvicorn
+    uvicorn asgi:application --workers 2
+
+The event loop owns the connections: request bodies are read and responses
+written asynchronously, so slow clients, slow uploads and idle keep-alive
+connections don't hold a thread. Only handling the request (the Flask view
+and its database.py calls) runs on a bounded thread pool of ASGI_THREADS
+threads, which also bounds the number of SQLite connections per process.
+At most ASGI_MAX_CONCURRENCY requests are handled or queued for the pool at
+once; the rest wait on the event loop.
+
+Views stay synchronous: Flask runs `async def` views on a fresh event loop
+inside the worker thread, which costs time and frees nothing.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Load environment variables from .env file (if python-dotenv is installed)
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+except ImportError:
+    pass
+
+from app import app
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', '8'))
+ASGI_MAX_CONCURRENCY = int(os.environ.get('ASGI_MAX_CONCURRENCY', '64'))
+# Request bodies larger than this are spooled to a temporary file
+BODY_SPOOL_SIZE = 1024 * 1024
+# Response bodies are handed from the pool to the event loop in pieces of about this size
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+_pool = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix='asgi')
+_slots = asyncio.Semaphore(ASGI_MAX_CONCURRENCY)
+
+class RequestTooLarge(Exception):
+    """The request body is over MAX_CONTENT_LENGTH"""
+
+def build_environ(scope, body, content_length):
+    """WSGI environ for an ASGI HTTP scope"""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').lower()
+        if name == 'content-length':
+            continue  # the body has been read; CONTENT_LENGTH is its real size
+        key = 'CONTENT_TYPE' if name == 'content-type' else 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key in environ:
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+def _start_wsgi(environ):
+    """Run the app in a pool thread.
+
+    Returns (status, headers, first body chunks, iterator over the rest or
+    None, the WSGI result to close once the rest has been sent).
+    """
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        started[:] = [status, headers]
+        return body.append
+
+    body = []
+    result = app(environ, start_response)
+    iterator = iter(result)
+    rest = _read_chunks(body, iterator)
+    if rest is None and hasattr(result, 'close'):
+        result.close()
+    return started[0], started[1], body, rest, result
+
+def _read_chunks(body, iterator):
+    """Append about RESPONSE_CHUNK_SIZE bytes to body; returns iterator, or None when exhausted"""
+    size = sum(map(len, body))
+    for chunk in iterator:
+        if chunk:
+            body.append(chunk)
+            size += len(chunk)
+        if size >= RESPONSE_CHUNK_SIZE:
+            return iterator
+    return None
+
+async def _read_body(receive, limit):
+    """Read the request body; returns (file, length), or None if the client left"""
+    body = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_SIZE)
+    length = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None
+        chunk = message.get('body', b'')
+        length += len(chunk)
+        if limit is not None and length > limit:
+            body.close()
+            raise RequestTooLarge()
+        body.write(chunk)
+        if not message.get('more_body'):
+            body.seek(0)
+            return body, length
+
+async def _send_status(send, status, text):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': text.encode('utf-8')})
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _pool.shutdown(wait=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        # No websockets here
+        if scope['type'] == 'websocket':
+            await send({'type': 'websocket.close'})
+        return
+
+    # Read the body on the event loop: slow uploads don't hold a thread
+    limit = app.config.get('MAX_CONTENT_LENGTH')
+    declared = dict(scope.get('headers', ())).get(b'content-length', b'')
+    try:
+        if limit is not None and declared.isdigit() and int(declared) > limit:
+            raise RequestTooLarge()
+        read = await _read_body(receive, limit)
+    except RequestTooLarge:
+        return await _send_status(send, 413, 'Request Entity Too Large')
+    if read is None:
+        return
+    body, length = read
+
+    loop = asyncio.get_running_loop()
+    environ = build_environ(scope, body, length)
+    async with _slots:
+        try:
+            status, headers, chunks, iterator, result = await loop.run_in_executor(_pool, _start_wsgi, environ)
+        finally:
+            body.close()
+
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    })
+    if iterator is None:
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+        return
+
+    # Long bodies (e.g. images) are read a piece at a time, so a slow reader
+    # only costs the event loop a pending send
+    try:
+        while chunks:
+            await send({'type': 'http.response.body', 'body': b''.join(chunks), 'more_body': True})
+            chunks = []
+            if iterator is not None:
+                iterator = await loop.run_in_executor(_pool, _read_chunks, chunks, iterator)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(result, 'close'):
+            await loop.run_in_executor(_pool, result.close)
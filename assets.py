@@ -0,0 +1,121 @@
+"""
+Fingerprinted static asset URLs
+Every file shipped under static/ gets a content hash in its URL
+(css/style.css -> css/style.1a2b3c4d.css). url_for('static', ...) resolves
+through the manifest automatically, and hashed URLs are served with a
+one-year immutable Cache-Control, so repeat visitors never re-request them.
+
+The manifest is rebuilt incrementally at startup: only files whose size or
+modification time changed are hashed again. It can also be built ahead of
+time with:
+    python assets.py
+"""
+import hashlib
+import json
+import os
+
+from compression import send_static
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
+MANIFEST_PATH = os.path.join(BASE_DIR, '.asset-manifest.json')
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+HASH_LENGTH = 8
+
+# Upload folders change at runtime and are not fingerprinted
+# (blobs already have content-addressed names)
+EXCLUDED_DIRS = ('images/blobs/', 'images/derivatives/', 'images/projects/', 'readme/')
+
+_manifest = {}   # original path -> hashed path
+_originals = {}  # hashed path -> original path
+
+def _hashed_name(rel_path, digest):
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+def _iter_assets():
+    for root, dirs, files in os.walk(STATIC_FOLDER):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            if name.startswith('.') or name.endswith(('.gz', '.br')):
+                continue
+            rel = os.path.relpath(os.path.join(root, name), STATIC_FOLDER).replace(os.sep, '/')
+            if not rel.startswith(EXCLUDED_DIRS):
+                yield rel
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LENGTH]
+
+def build_manifest():
+    """Update the on-disk manifest, hashing only new or changed files.
+
+    Returns (entries, rehashed).
+    """
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (FileNotFoundError, ValueError):
+        previous = {}
+
+    entries = {}
+    rehashed = 0
+    for rel in _iter_assets():
+        stat = os.stat(os.path.join(STATIC_FOLDER, rel))
+        entry = previous.get(rel)
+        if not entry or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {
+                'hash': _file_digest(os.path.join(STATIC_FOLDER, rel)),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+            }
+            rehashed += 1
+        entries[rel] = entry
+
+    if entries != previous:
+        tmp = MANIFEST_PATH + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, MANIFEST_PATH)
+    return entries, rehashed
+
+def load_manifest():
+    """Build the manifest and load it for URL generation"""
+    global _manifest, _originals
+    entries, _ = build_manifest()
+    manifest = {rel: _hashed_name(rel, entry['hash']) for rel, entry in entries.items()}
+    _originals = {hashed: rel for rel, hashed in manifest.items()}
+    _manifest = manifest
+    return manifest
+
+def hashed_path(rel_path):
+    """Fingerprinted path for a static file, or the path itself if unknown"""
+    return _manifest.get(rel_path, rel_path)
+
+def fingerprint_static_urls(endpoint, values):
+    """url_defaults hook: make url_for('static') point at fingerprinted files"""
+    if endpoint == 'static' and values.get('filename') in _manifest:
+        values['filename'] = _manifest[values['filename']]
+
+def serve_static(filename):
+    """Static view that understands fingerprinted file names"""
+    original = _originals.get(filename)
+    if original is None:
+        return send_static(filename)
+    response = send_static(original, max_age=ASSET_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+def init_app(app):
+    """Load the manifest and route static URLs through it"""
+    load_manifest()
+    app.url_defaults(fingerprint_static_urls)
+    app.view_functions['static'] = serve_static
+
+if __name__ == '__main__':
+    entries, rehashed = build_manifest()
+    print(f"Asset manifest: {len(entries)} files, {rehashed} re-hashed")
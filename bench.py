@@ -0,0 +1,562 @@
+"""
+Benchmark suite
+Seeds a scratch database at each requested scale and times every route
+(through Flask's test client, logged in as admin) and the database.py
+helpers. Admin writes (project and category forms, bulk edits, a chunked
+upload round trip) run as scenarios that restore their own state, so the
+scratch data stays the same size. Each scale runs in its own process against its own database, so
+caches and memory figures don't carry over between scales. The data is
+generated from a fixed seed, so runs on the same machine are comparable.
+
+Each benchmark reports throughput, p50/p95/p99 latency and the peak Python
+memory allocated by one call (tracemalloc). Routes are timed twice: 'warm'
+as normally served (page cache hits) and 'cold' with the page cache
+cleared before every request.
+
+A baseline saved with --save-baseline can be compared on later runs:
+p50 latency or peak memory worse than the baseline by more than
+--tolerance, or p95 worse by more than twice that (tails are noisier), is
+a regression and the exit status is 1. Differences below a small absolute
+margin never count, so microsecond jitter doesn't fail the run.
+
+Use:
+    python bench.py [--scales 10,1000,100000] [-o results.json]
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json [--tolerance 0.3]
+"""
+import argparse
+import contextlib
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+DEFAULT_SCALES = (10, 1000)
+DEFAULT_ITERATIONS = 50
+WARMUP_ITERATIONS = 3
+MIN_ITERATIONS = 5
+# A benchmark stops early once it has run this long (and MIN_ITERATIONS)
+MAX_SECONDS_PER_BENCHMARK = 5.0
+SEED = 1234
+
+DEFAULT_TOLERANCE = 0.3
+# Differences smaller than these are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 1.0
+MIN_MEMORY_DELTA_KB = 64
+
+# Never benchmarked: logging out would end the admin session
+UNSAFE_ENDPOINTS = {'admin.logout'}
+# GET routes with side effects, timed as write scenarios instead
+WRITE_GET_ENDPOINTS = {'admin.delete_project_route'}
+SCRATCH_TITLE = 'Benchmark scratch project'
+SCRATCH_CATEGORY = 'bench-scratch'
+
+TECHNOLOGIES = (
+    'Python', 'Flask', 'Django', 'FastAPI', 'SQLite', 'PostgreSQL', 'Redis', 'JavaScript',
+    'TypeScript', 'React', 'Vue', 'Svelte', 'Node.js', 'C++', 'C#', 'Rust', 'Go', 'Java',
+    'Kotlin', 'Swift', 'Unity', 'Unreal', 'Godot', 'Blender', 'Figma', 'Adobe XD',
+    'Photoshop', 'Illustrator', 'Pygame', 'OpenGL', 'Vulkan', 'WebGL', 'Three.js', 'Docker',
+    'Kubernetes', 'AWS', 'GCP', 'Azure', 'TensorFlow', 'PyTorch', 'NumPy', 'Pandas',
+    'scikit-learn', 'OpenCV', 'Arduino', 'Raspberry Pi', 'HTML', 'CSS', 'Sass', 'Tailwind',
+)
+WORDS = (
+    'game', 'design', 'system', 'render', 'engine', 'interactive', 'prototype', 'player',
+    'level', 'shader', 'model', 'animation', 'interface', 'mobile', 'web', 'data', 'network',
+    'physics', 'puzzle', 'platformer', 'multiplayer', 'dashboard', 'analytics', 'pipeline',
+    'procedural', 'terrain', 'lighting', 'texture', 'audio', 'controller', 'inventory',
+    'quest', 'dialogue', 'editor', 'plugin', 'tool', 'camera', 'particle', 'simulation',
+    'classic', 'modern', 'minimal', 'responsive', 'realtime', 'offline', 'cloud', 'fast',
+)
+IMAGES = ('SnakeGame.png', 'GuessWho.png', 'PythonProjects.jpg', 'apps-projects.png', 'blender-projects.png')
+
+def _sentence(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n)).capitalize() + '.'
+
+def category_rows(scale):
+    """Extra categories beyond the defaults, more of them at larger scales"""
+    count = min(200, scale // 100)
+    for i in range(count):
+        yield i + 1, {
+            'id': f'bench-{i}',
+            'name': f'Bench Category {i}',
+            'icon': '📁',
+            'color': '#888888',
+            'sort_order': 100 + i,
+            # Some hidden categories, like a real catalog
+            'is_listed': i % 10 != 9,
+        }
+
+def project_rows(scale, category_ids, seed=SEED):
+    rng = random.Random(seed)
+    started = datetime(2020, 1, 1)
+    for i in range(scale):
+        paragraphs = ''.join(f'<p>{_sentence(rng, rng.randint(20, 60))}</p>' for _ in range(rng.randint(1, 4)))
+        yield i + 1, {
+            'title': f'{_sentence(rng, 3)[:-1]} {i}',
+            'category': rng.choice(category_ids),
+            'description': _sentence(rng, rng.randint(8, 20)),
+            'full_description': f'<h2>Overview</h2>{paragraphs}',
+            'technologies': ', '.join(rng.sample(TECHNOLOGIES, rng.randint(1, 5))),
+            'image_url': rng.choice(IMAGES),
+            'screenshots': ','.join(rng.sample(IMAGES, rng.randint(0, 3))),
+            'project_url': f'https://example.com/{i}',
+            'github_url': f'https://github.com/example/project-{i}',
+            'featured': rng.random() < 0.05,
+            'created_at': (started + timedelta(minutes=i * 7 + rng.randint(0, 6))).strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+def seed_database(scale):
+    """Fill the (fresh) database at DATABASE_PATH; returns the seeding time"""
+    from bulk import import_categories, import_projects
+    from database import get_all_categories, init_db
+
+    started = time.perf_counter()
+    init_db()
+    import_categories(category_rows(scale), chunk_size=1000)
+    category_ids = [category['id'] for category in get_all_categories()]
+    inserted, _, errors = import_projects(project_rows(scale, category_ids), chunk_size=2000)
+    assert inserted == scale and not errors, errors[:5]
+    return time.perf_counter() - started
+
+def _percentile(sorted_times, q):
+    return sorted_times[min(len(sorted_times) - 1, max(0, math.ceil(q * len(sorted_times)) - 1))]
+
+def measure(fn, iterations, setup=None):
+    """Time fn() after setup() (untimed); returns the summary dict"""
+    for _ in range(WARMUP_ITERATIONS):
+        if setup:
+            setup()
+        fn()
+
+    # Like timeit, keep collector pauses out of the timings
+    times = []
+    deadline = time.perf_counter() + MAX_SECONDS_PER_BENCHMARK
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+            if len(times) >= MIN_ITERATIONS and time.perf_counter() > deadline:
+                break
+    finally:
+        gc.enable()
+
+    # Memory is measured on a separate call; tracing would skew the timings
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    times.sort()
+    return {
+        'iterations': len(times),
+        'ops_per_sec': round(len(times) / sum(times), 2),
+        'p50_ms': round(_percentile(times, 0.50) * 1000, 4),
+        'p95_ms': round(_percentile(times, 0.95) * 1000, 4),
+        'p99_ms': round(_percentile(times, 0.99) * 1000, 4),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+def sample_values(conn):
+    """Representative arguments for routes and helpers"""
+    from database import encode_cursor
+
+    category = conn.execute('''
+        SELECT p.category FROM projects p JOIN categories c ON c.id = p.category
+        WHERE c.is_listed = 1 GROUP BY p.category ORDER BY COUNT(*) DESC, p.category LIMIT 1
+    ''').fetchone()[0]
+    projects = conn.execute('''
+        SELECT p.id, p.sort_order FROM projects p JOIN categories c ON c.id = p.category
+        WHERE c.is_listed = 1 ORDER BY p.sort_order, p.id
+    ''').fetchall()
+    middle = projects[len(projects) // 2]
+    other_category = conn.execute(
+        'SELECT id FROM categories WHERE id != ? ORDER BY sort_order, id LIMIT 1', (category,)
+    ).fetchone()[0]
+    tag = conn.execute('''
+        SELECT t.id, t.slug FROM tags t JOIN project_tags pt ON pt.tag_id = t.id
+        GROUP BY t.id ORDER BY COUNT(*) DESC, t.slug LIMIT 1
+    ''').fetchone()
+    return {
+        'category': category,
+        'category_id': category,
+        'other_category': other_category,
+        'project_id': middle['id'],
+        'project_ids': [p['id'] for p in projects[:24]],
+        'cursor': encode_cursor(middle),
+        'tag': tag['slug'],
+        'tag_id': tag['id'],
+        'search': WORDS[0],
+        'image': IMAGES[0],
+        'filename': 'css/style.css',
+    }
+
+def route_urls(app, samples):
+    """(name, url) for every safe GET route, plus paged/query variants; and the rules left out"""
+    from flask import url_for
+
+    urls, skipped = [], []
+    with app.test_request_context():
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.endpoint):
+            if 'GET' not in rule.methods or rule.endpoint in UNSAFE_ENDPOINTS | WRITE_GET_ENDPOINTS:
+                skipped.append(rule.endpoint)
+                continue
+            if not all(arg in samples for arg in rule.arguments):
+                skipped.append(rule.endpoint)
+                continue
+            urls.append((rule.endpoint, url_for(rule.endpoint, **{arg: samples[arg] for arg in rule.arguments})))
+        # Deep pages and query variants that take other code paths
+        urls += [
+            ('portfolio_category?after', url_for('portfolio_category', category=samples['category'], after=samples['cursor'])),
+            ('admin.dashboard?after', url_for('admin.dashboard', after=samples['cursor'])),
+            ('api.projects?ids', url_for('api.projects', ids=','.join(map(str, samples['project_ids'])))),
+            ('api.projects?tag', url_for('api.projects', tag=samples['tag'])),
+            ('api.search?q', url_for('api.search', q=samples['search'])),
+        ]
+    return urls, skipped
+
+def db_benchmarks(samples):
+    """(name, fn, setup) for the database.py helpers; read-only ones first"""
+    import database as db
+
+    project = db.get_project_by_id(samples['project_id'])
+    page_ids = samples['project_ids']
+    return [
+        ('get_content_version', db.get_content_version, None),
+        ('get_all_categories', db.get_all_categories, None),
+        ('get_all_categories:cold', db.get_all_categories, db.invalidate_category_cache),
+        ('get_listed_categories', db.get_listed_categories, None),
+        ('get_category_by_id', lambda: db.get_category_by_id(samples['category']), None),
+        ('get_all_projects', db.get_all_projects, None),
+        ('get_projects_by_category', lambda: db.get_projects_by_category(samples['category']), None),
+        ('get_projects_page', lambda: db.get_projects_page(limit=24), None),
+        ('get_projects_page:category', lambda: db.get_projects_page(samples['category'], limit=24), None),
+        ('get_projects_page:after', lambda: db.get_projects_page(after=samples['cursor'], limit=24), None),
+        ('get_projects_page:tag', lambda: db.get_projects_page(tag=samples['tag_id'], limit=24, listed_only=True), None),
+        ('count_projects', db.count_projects, None),
+        ('count_projects:category', lambda: db.count_projects(samples['category']), None),
+        ('search_projects', lambda: db.search_projects(samples['search']), None),
+        ('get_project_by_id', lambda: db.get_project_by_id(samples['project_id']), None),
+        ('get_projects_by_ids', lambda: db.get_projects_by_ids(page_ids), None),
+        ('get_project_tags', lambda: db.get_project_tags(page_ids), None),
+        ('get_project_images', lambda: db.get_project_images(page_ids), None),
+        ('get_tag_by_slug', lambda: db.get_tag_by_slug(samples['tag']), None),
+        ('get_tag_counts', db.get_tag_counts, None),
+        ('get_tag_counts:cold', db.get_tag_counts, db.invalidate_tag_cache),
+        ('get_image_derivatives', lambda: db.get_image_derivatives(samples['image']), None),
+        ('get_markdown_projects', lambda: db.get_markdown_projects(page_ids), None),
+        # Writes last: each one bumps the content version
+        ('update_project', lambda: db.update_project(
+            project['id'], project['title'], project['category'], project['description'],
+            project['technologies'], project['image_url'], project['project_url'], project['github_url'],
+            project['featured'], project['full_description'], project['screenshots'],
+        ), None),
+        ('set_project_processing_status', lambda: db.set_project_processing_status(project['id'], 'ready'), None),
+        ('add_project+delete_project', lambda: db.delete_project(db.add_project(
+            'Benchmark scratch project', samples['category'], 'Scratch', 'Python, Flask', IMAGES[0],
+        )), None),
+        ('apply_admin_operations:reorder_page', lambda: db.apply_admin_operations([
+            {'op': 'reorder_projects', 'ids': page_ids[::-1]},
+        ]), None),
+    ]
+
+def _clear_flashes(client):
+    # Unread flash messages would pile up in the session cookie
+    with client.session_transaction() as session:
+        session.pop('_flashes', None)
+
+def write_scenarios(client, samples):
+    """(name, endpoints, fn, setup) for every admin route that changes data.
+
+    fn makes the requests and returns the last status; setup (untimed)
+    restores what the previous call changed. Call within a request context
+    (for url_for).
+    """
+    import database as db
+    from admin import ADMIN_PASSWORD, ADMIN_USERNAME
+    from flask import url_for
+
+    project = db.get_project_by_id(samples['project_id'])
+    page_ids = samples['project_ids']
+    form = {field: project[field] or '' for field in (
+        'title', 'category', 'description', 'full_description', 'technologies', 'project_url', 'github_url',
+    )}
+    if project['featured']:
+        form['featured'] = 'on'
+    category_form = {'category_id': SCRATCH_CATEGORY, 'name': 'Bench Scratch', 'icon': '🧪', 'color': '#888888'}
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'images', IMAGES[0]), 'rb') as f:
+        image = f.read()
+    scratch = {}
+
+    def post(url, **kwargs):
+        return client.post(url, **kwargs).status_code
+
+    def reset():
+        _clear_flashes(client)
+
+    def without_scratch_projects():
+        reset()
+        conn = db.get_db_connection()
+        for row in conn.execute('SELECT id FROM projects WHERE title = ?', (SCRATCH_TITLE,)).fetchall():
+            db.delete_project(row['id'])
+
+    def with_scratch_project():
+        reset()
+        scratch['project_id'] = db.add_project(SCRATCH_TITLE, samples['category'], 'Scratch', 'Python', '')
+
+    def without_scratch_category():
+        reset()
+        db.delete_category(SCRATCH_CATEGORY)
+
+    def with_scratch_category():
+        reset()
+        if db.get_category_by_id(SCRATCH_CATEGORY) is None:
+            db.add_category(SCRATCH_CATEGORY, category_form['name'], category_form['icon'], category_form['color'])
+
+    def page_moved_away():
+        reset()
+        db.apply_admin_operations([{'op': 'move_projects', 'ids': page_ids, 'category': samples['other_category']}])
+
+    def start_upload():
+        upload = client.post(url_for('admin.start_upload'), json={'filename': IMAGES[0], 'size': len(image)}).get_json()
+        return upload, url_for('admin.upload', upload_id=upload['id'])
+
+    def upload_round_trip():
+        upload, url = start_upload()
+        for offset in range(0, len(image), upload['chunk_size']):
+            client.put(f'{url}?offset={offset}', data=image[offset:offset + upload['chunk_size']])
+        # What a client resuming after a dropped connection asks first
+        client.get(url)
+        return post(url_for('admin.finish_upload', upload_id=upload['id']))
+
+    def cancelled_upload():
+        _, url = start_upload()
+        return client.delete(url).status_code
+
+    return [
+        ('admin.login', {'admin.login'}, lambda: post(
+            url_for('admin.login'), data={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD},
+        ), reset),
+        ('admin.new_project', {'admin.new_project'}, lambda: post(
+            url_for('admin.new_project'), data=dict(form, title=SCRATCH_TITLE),
+        ), without_scratch_projects),
+        ('admin.edit_project', {'admin.edit_project'}, lambda: post(
+            url_for('admin.edit_project', project_id=project['id']), data=form,
+        ), reset),
+        ('admin.delete_project_route', {'admin.delete_project_route'}, lambda: client.get(
+            url_for('admin.delete_project_route', project_id=scratch['project_id']),
+        ).status_code, with_scratch_project),
+        ('admin.add_category', {'admin.add_category'}, lambda: post(
+            url_for('admin.add_category'), data=category_form,
+        ), without_scratch_category),
+        ('admin.edit_category', {'admin.edit_category'}, lambda: post(
+            url_for('admin.edit_category', category_id=SCRATCH_CATEGORY), data=category_form,
+        ), with_scratch_category),
+        ('admin.toggle_category', {'admin.toggle_category'}, lambda: post(
+            url_for('admin.toggle_category', category_id=SCRATCH_CATEGORY),
+        ), with_scratch_category),
+        ('admin.delete_category', {'admin.delete_category'}, lambda: post(
+            url_for('admin.delete_category', category_id=SCRATCH_CATEGORY),
+        ), with_scratch_category),
+        ('admin.bulk_edit:move', {'admin.bulk_edit'}, lambda: post(
+            url_for('admin.bulk_edit'),
+            json={'operations': [{'op': 'move_projects', 'ids': page_ids, 'category': samples['category']}]},
+        ), page_moved_away),
+        ('admin.bulk_edit:reorder', {'admin.bulk_edit'}, lambda: post(
+            url_for('admin.bulk_edit'), json={'operations': [{'op': 'reorder_projects', 'ids': page_ids[::-1]}]},
+        ), reset),
+        ('admin.start_upload+upload+finish_upload', {'admin.start_upload', 'admin.upload', 'admin.finish_upload'},
+         upload_round_trip, reset),
+        ('admin.upload:delete', {'admin.upload'}, cancelled_upload, reset),
+    ]
+
+def run_scale(scale, iterations):
+    """Seed and benchmark one scale in this process (DATABASE_PATH must be a scratch file)"""
+    # Keep stdout free of startup chatter
+    with contextlib.redirect_stdout(sys.stderr):
+        seed_seconds = seed_database(scale)
+        from app import app
+        from database import get_db_connection
+        from page_cache import clear_page_cache
+
+    samples = sample_values(get_db_connection())
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+
+    benchmarks = {}
+    urls, skipped = route_urls(app, samples)
+    for name, url in urls:
+        status = client.get(url).status_code
+        if status != 200:
+            print(f"  ! {name}: {url} returned {status}", file=sys.stderr)
+        for mode, setup in (('warm', None), ('cold', clear_page_cache)):
+            result = measure(lambda: client.get(url).close(), iterations, setup)
+            benchmarks[f'route:{name}:{mode}'] = dict(result, url=url, status=status)
+        print(f"  route {name}", file=sys.stderr)
+
+    for name, fn, setup in db_benchmarks(samples):
+        benchmarks[f'db:{name}'] = measure(fn, iterations, setup)
+        print(f"  db {name}", file=sys.stderr)
+
+    # Last, as they move projects around. Chunked uploads and the blobs they
+    # complete into go to the scratch directory, not this checkout.
+    import storage
+    import uploads
+    scratch_dir = os.path.dirname(os.environ['DATABASE_PATH'])
+    uploads.UPLOADS_DIR = os.path.join(scratch_dir, 'uploads')
+    storage.IMAGES_FOLDER = os.path.join(scratch_dir, 'images')
+    written = set()
+    with app.test_request_context():
+        for name, endpoints, fn, setup in write_scenarios(client, samples):
+            setup()
+            status = fn()
+            if status >= 400:
+                print(f"  ! {name} returned {status}", file=sys.stderr)
+            benchmarks[f'write:{name}'] = dict(measure(fn, iterations, setup), status=status)
+            written |= endpoints
+            print(f"  write {name}", file=sys.stderr)
+    skipped = [endpoint for endpoint in skipped if endpoint not in written]
+
+    return {
+        'projects': scale,
+        'categories': get_db_connection().execute('SELECT COUNT(*) FROM categories').fetchone()[0],
+        'seed_seconds': round(seed_seconds, 2),
+        'skipped_endpoints': skipped,
+        'benchmarks': benchmarks,
+    }
+
+def run(scales, iterations):
+    """Benchmark each scale in a fresh process with its own scratch database"""
+    results = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'seed': SEED,
+            'iterations': iterations,
+        },
+        'scales': {},
+    }
+    for scale in scales:
+        print(f"Scale {scale}:", file=sys.stderr)
+        with tempfile.TemporaryDirectory(prefix='portfolio-bench-') as tmp:
+            output = os.path.join(tmp, 'result.json')
+            env = dict(
+                os.environ,
+                DATABASE_PATH=os.path.join(tmp, 'portfolio.db'),
+                JOB_WORKERS='0',
+                PYTHONHASHSEED='0',
+            )
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--worker', str(scale),
+                 '--worker-output', output, '--iterations', str(iterations)],
+                env=env, check=True,
+            )
+            with open(output, encoding='utf-8') as f:
+                results['scales'][str(scale)] = json.load(f)
+    return results
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions against a baseline, as human-readable lines"""
+    regressions = []
+    for scale, base_scale in baseline['scales'].items():
+        current = results['scales'].get(scale)
+        if not current:
+            continue
+        for name, base in base_scale['benchmarks'].items():
+            now = current['benchmarks'].get(name)
+            if not now:
+                continue
+            checks = (
+                ('p50_ms', tolerance, MIN_LATENCY_DELTA_MS),
+                ('p95_ms', tolerance * 2, MIN_LATENCY_DELTA_MS),
+                ('peak_kb', tolerance, MIN_MEMORY_DELTA_KB),
+            )
+            for metric, allowed, min_delta in checks:
+                before, after = base[metric], now[metric]
+                if after > before * (1 + allowed) and after - before > min_delta:
+                    regressions.append(f"{scale} {name} {metric}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)"
+                                       if before else f"{scale} {name} {metric}: {before} -> {after}")
+    return regressions
+
+def _print_summary(results):
+    for scale, result in results['scales'].items():
+        print(f"\n{scale} projects, {result['categories']} categories (seeded in {result['seed_seconds']}s)", file=sys.stderr)
+        print(f"  {'benchmark':<48} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KB':>9}", file=sys.stderr)
+        for name, b in result['benchmarks'].items():
+            print(f"  {name:<48} {b['ops_per_sec']:>10} {b['p50_ms']:>9.3f} {b['p95_ms']:>9.3f} "
+                  f"{b['p99_ms']:>9.3f} {b['peak_kb']:>9}", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark routes and database helpers at several scales')
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help='comma-separated project counts (default: %(default)s)')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='timed calls per benchmark')
+    parser.add_argument('-o', '--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='compare with this results file; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown/growth as a fraction (default: %(default)s)')
+    parser.add_argument('--save-baseline', metavar='PATH', help='also write the results to PATH as the new baseline')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--worker-output', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        result = run_scale(args.worker, args.iterations)
+        with open(args.worker_output, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+    results = run(scales, args.iterations)
+    _print_summary(results)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"\nSaved baseline to {args.save_baseline}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('platform') != results['meta']['platform']:
+            print("\nWarning: baseline was recorded on a different platform", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) against {args.baseline}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            return 1
+        print(f"\n✓ No regressions against {args.baseline}", file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
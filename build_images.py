@@ -0,0 +1,49 @@
+"""
+Image derivative back-fill
+Generates resized WebP/JPEG copies for images already under static/images,
+and records the size, colour and blurred preview of each (see images.py).
+Newly uploaded images get both automatically.
+
+Use: python build_images.py [--force] [--metadata-only]
+"""
+import argparse
+import os
+
+from database import init_db, get_image_derivatives, get_image_metadata
+from images import IMAGES_FOLDER, is_derivable, is_measurable, generate_derivatives, record_image_metadata
+
+def iter_images():
+    """Yield paths (relative to static/images) of every image we can process"""
+    for root, _, files in os.walk(IMAGES_FOLDER):
+        for name in sorted(files):
+            rel = os.path.relpath(os.path.join(root, name), IMAGES_FOLDER).replace(os.sep, '/')
+            if is_measurable(rel):
+                yield rel
+
+def backfill(force=False, metadata_only=False):
+    """Generate missing derivatives and metadata; returns (processed, skipped, failed)"""
+    processed = skipped = failed = 0
+    for image_path in iter_images():
+        derive = is_derivable(image_path) and not metadata_only and (force or not get_image_derivatives(image_path))
+        if not derive and not force and get_image_metadata(image_path):
+            skipped += 1
+            continue
+        # Deriving records the metadata as well
+        if generate_derivatives(image_path) if derive else record_image_metadata(image_path):
+            processed += 1
+            print(f"✓ {image_path}")
+        else:
+            failed += 1
+            print(f"✗ {image_path} (could not be read)")
+    return processed, skipped, failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Back-fill responsive image derivatives and metadata')
+    parser.add_argument('--force', action='store_true', help='regenerate images that already have derivatives')
+    parser.add_argument('--metadata-only', action='store_true',
+                        help='only record missing sizes and placeholders (no resizing)')
+    args = parser.parse_args()
+
+    init_db()
+    processed, skipped, failed = backfill(force=args.force, metadata_only=args.metadata_only)
+    print(f"\nDone: {processed} processed, {skipped} already up to date, {failed} failed")
@@ -0,0 +1,319 @@
+"""
+Bulk import/export of projects and categories
+Streams JSON Lines or CSV in and out of the database, for catalog loads and
+staging refreshes.
+
+Imports are batched: each chunk of rows is written with executemany in a
+single transaction, so a few thousand projects load in seconds instead of
+one commit per row. Rows are matched on a natural key and updated in
+place: projects by (category, title), categories by id. Columns missing
+from the input (or empty CSV cells) are left untouched on update and get
+their default on insert. Invalid rows are reported
+with their line number and skipped; --dry-run validates without writing.
+
+Exports read the table with a cursor and write row by row, so the whole
+table is never held in memory.
+
+Use:
+    python bulk.py export projects [-o projects.jsonl] [--format csv]
+    python bulk.py import projects projects.jsonl [--dry-run] [--chunk-size 500]
+    python bulk.py import categories categories.csv
+"""
+import argparse
+import contextlib
+import csv
+import json
+import sys
+from datetime import datetime
+
+from database import (
+    bump_content_version, get_db_connection, init_db, invalidate_category_cache,
+    invalidate_tag_cache, sync_project_images, sync_project_tags,
+)
+from storage import recount_blob_refs
+
+PROJECT_COLUMNS = (
+    'id', 'title', 'category', 'description', 'full_description', 'technologies', 'image_url',
+    'screenshots', 'project_url', 'github_url', 'featured', 'created_at', 'sort_order',
+)
+CATEGORY_COLUMNS = ('id', 'name', 'icon', 'icon_image', 'color', 'is_listed', 'sort_order', 'created_at')
+BOOLEAN_COLUMNS = ('featured', 'is_listed')
+# A null here is never meant literally: it keeps the current value / column default
+DEFAULTED_COLUMNS = BOOLEAN_COLUMNS + ('created_at', 'sort_order')
+DEFAULT_CHUNK_SIZE = 500
+
+def _detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path and path.lower().endswith('.csv') else 'jsonl'
+
+def read_rows(stream, fmt):
+    """Yield (line number, row dict) from a JSONL or CSV stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty CSV cells mean "not given", like a key missing from a JSON row
+            yield reader.line_num, {key: value for key, value in row.items() if value != ''}
+        return
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_num, e
+            continue
+        yield line_num, row if isinstance(row, dict) else ValueError('expected a JSON object')
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return int(value)
+    if str(value).strip().lower() in ('1', 'true', 'yes', 'y'):
+        return 1
+    if str(value).strip().lower() in ('0', 'false', 'no', 'n'):
+        return 0
+    raise ValueError(f'not a boolean: {value!r}')
+
+def _clean(row, columns, required, key_columns=()):
+    """Validate and normalize one input row; returns the cleaned dict"""
+    if isinstance(row, Exception):
+        raise ValueError(f'invalid JSON: {row}')
+    unknown = [key for key in row if key not in columns]
+    if unknown:
+        raise ValueError(f"unknown column(s): {', '.join(unknown)}")
+    cleaned = {}
+    for key, value in row.items():
+        if value is None and key in DEFAULTED_COLUMNS:
+            continue
+        if key in BOOLEAN_COLUMNS:
+            value = _parse_bool(value)
+        elif key == 'sort_order':
+            value = int(value)
+        elif key == 'created_at':
+            datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        elif isinstance(value, list) and key in ('technologies', 'screenshots'):
+            value = ','.join(value)
+        cleaned[key] = value
+    for key in required:
+        if not cleaned.get(key):
+            raise ValueError(f'missing {key}')
+    for key in key_columns:
+        cleaned[key] = str(cleaned[key]).strip()
+    return cleaned
+
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _grouped(rows):
+    """Group cleaned rows by their column set so each group is one executemany"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups.items()
+
+def _validated(rows, columns, required, key_columns, errors, extra_check=None):
+    for line_num, row in rows:
+        try:
+            cleaned = _clean(row, columns, required, key_columns)
+            if extra_check:
+                extra_check(cleaned)
+        except (ValueError, TypeError) as e:
+            errors.append((line_num, str(e)))
+            continue
+        yield cleaned
+
+def import_projects(rows, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """Upsert projects keyed on (category, title).
+
+    rows yields (line number, dict). Returns (inserted, updated, errors).
+    """
+    conn = get_db_connection()
+    categories = {row['id'] for row in conn.execute('SELECT id FROM categories')}
+    existing = {
+        (row['category'], row['title']): row['id']
+        for row in conn.execute('SELECT id, category, title FROM projects')
+    }
+
+    def check_category(row):
+        if row['category'] not in categories:
+            raise ValueError(f"unknown category: {row['category']}")
+
+    errors = []
+    inserted = updated = 0
+    valid = _validated(rows, PROJECT_COLUMNS, ('title', 'category'), ('title', 'category'), errors, check_category)
+    for chunk in _chunks(valid, chunk_size):
+        inserts, updates = [], []
+        for row in chunk:
+            # Exported ids are informational; the natural key decides
+            row.pop('id', None)
+            key = (row['category'], row['title'])
+            if key in existing:
+                updates.append(dict(row, id=existing[key]))
+            else:
+                # Later rows with the same key in this file update this one
+                existing[key] = None
+                inserts.append(row)
+        # Duplicates of a row inserted in this chunk can't be updated by id yet
+        pending = [row for row in updates if row['id'] is None]
+        updates = [row for row in updates if row['id'] is not None]
+        if dry_run:
+            inserted += len(inserts)
+            updated += len(updates) + len(pending)
+            continue
+
+        first_new_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM projects').fetchone()[0]
+        for columns, group in _grouped(inserts):
+            conn.executemany(
+                f"INSERT INTO projects ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [tuple(row[c] for c in columns) for row in group]
+            )
+        new_rows = conn.execute(
+            'SELECT id, category, title FROM projects WHERE id >= ?', (first_new_id,)
+        ).fetchall()
+        for row in new_rows:
+            existing[(row['category'], row['title'])] = row['id']
+        updates += [dict(row, id=existing[(row['category'], row['title'])]) for row in pending]
+
+        for columns, group in _grouped(updates):
+            assignments = ', '.join(f'{c} = ?' for c in columns if c != 'id')
+            conn.executemany(
+                f'UPDATE projects SET {assignments} WHERE id = ?',
+                [tuple(row[c] for c in columns if c != 'id') + (row['id'],) for row in group]
+            )
+
+        # Keep the normalized tag/screenshot tables in step
+        touched = [row['id'] for row in new_rows] + [row['id'] for row in updates]
+        placeholders = ','.join('?' * len(touched))
+        for project in conn.execute(
+            f'SELECT id, technologies, screenshots FROM projects WHERE id IN ({placeholders})', touched
+        ).fetchall():
+            sync_project_tags(conn, project['id'], project['technologies'])
+            sync_project_images(conn, project['id'], project['screenshots'])
+
+        bump_content_version(conn)
+        conn.commit()
+        inserted += len(inserts)
+        updated += len(updates)
+
+    if not dry_run and (inserted or updated):
+        conn.execute('DELETE FROM tags WHERE id NOT IN (SELECT tag_id FROM project_tags)')
+        recount_blob_refs(conn)
+        conn.commit()
+        invalidate_tag_cache()
+    return inserted, updated, errors
+
+def import_categories(rows, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """Upsert categories keyed on id.
+
+    rows yields (line number, dict). Returns (inserted, updated, errors).
+    """
+    conn = get_db_connection()
+    existing = {row['id'] for row in conn.execute('SELECT id FROM categories')}
+
+    errors = []
+    inserted = updated = 0
+    valid = _validated(rows, CATEGORY_COLUMNS, ('id', 'name'), ('id',), errors)
+    for chunk in _chunks(valid, chunk_size):
+        for row in chunk:
+            if row['id'] in existing:
+                updated += 1
+            else:
+                inserted += 1
+                existing.add(row['id'])
+        if dry_run:
+            continue
+
+        for columns, group in _grouped(chunk):
+            assignments = ', '.join(f'{c} = excluded.{c}' for c in columns if c != 'id')
+            conn.executemany(
+                f"INSERT INTO categories ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(id) DO UPDATE SET {assignments}",
+                [tuple(row[c] for c in columns) for row in group]
+            )
+        bump_content_version(conn)
+        conn.commit()
+
+    if not dry_run and (inserted or updated):
+        recount_blob_refs(conn)
+        conn.commit()
+        invalidate_category_cache()
+        invalidate_tag_cache()
+    return inserted, updated, errors
+
+def export_rows(table, stream, fmt):
+    """Stream every row of projects or categories to stream; returns the row count"""
+    if table == 'projects':
+        columns, order = PROJECT_COLUMNS, 'id'
+    else:
+        columns, order = CATEGORY_COLUMNS, 'sort_order, id'
+    conn = get_db_connection()
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {order}")
+
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+    count = 0
+    for row in cursor:
+        if writer:
+            writer.writerow(['' if value is None else value for value in row])
+        else:
+            stream.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+IMPORTERS = {'projects': import_projects, 'categories': import_categories}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import/export projects and categories')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help='write a table as JSONL or CSV')
+    export.add_argument('table', choices=sorted(IMPORTERS))
+    export.add_argument('-o', '--output', help='output file (default: stdout)')
+    export.add_argument('--format', choices=('jsonl', 'csv'), help='default: from the file extension, else jsonl')
+
+    load = commands.add_parser('import', help='upsert rows from JSONL or CSV')
+    load.add_argument('table', choices=sorted(IMPORTERS))
+    load.add_argument('input', help="input file ('-' for stdin)")
+    load.add_argument('--format', choices=('jsonl', 'csv'), help='default: from the file extension, else jsonl')
+    load.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per transaction')
+    load.add_argument('--dry-run', action='store_true', help='validate only, write nothing')
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for exported data
+    with contextlib.redirect_stdout(sys.stderr):
+        init_db()
+
+    if args.command == 'export':
+        fmt = _detect_format(args.output, args.format)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8', newline='') as f:
+                count = export_rows(args.table, f, fmt)
+        else:
+            count = export_rows(args.table, sys.stdout, fmt)
+        print(f"Exported {count} {args.table}", file=sys.stderr)
+        return 0
+
+    fmt = _detect_format(args.input, args.format)
+    if args.input == '-':
+        inserted, updated, errors = IMPORTERS[args.table](read_rows(sys.stdin, fmt), args.chunk_size, args.dry_run)
+    else:
+        with open(args.input, 'r', encoding='utf-8', newline='') as f:
+            inserted, updated, errors = IMPORTERS[args.table](read_rows(f, fmt), args.chunk_size, args.dry_run)
+
+    for line_num, message in errors:
+        print(f"✗ line {line_num}: {message}", file=sys.stderr)
+    action = 'Would import' if args.dry_run else 'Imported'
+    print(f"{action} {args.table}: {inserted} new, {updated} updated, {len(errors)} invalid")
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
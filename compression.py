@@ -0,0 +1,154 @@
+"""
+Response compression
+Dynamic HTML/JSON responses are gzip- or brotli-compressed according to the
+client's Accept-Encoding. Compressed bodies of cached pages are remembered
+by ETag, so a page is compressed once per content change, not per request.
+
+Static text assets are never compressed per request: run
+    python compression.py
+to write .gz/.br siblings next to them once; the static view sends those
+directly when the client accepts the encoding.
+
+Brotli needs the optional `brotli` package (pip install brotli);
+without it only gzip is used.
+"""
+import gzip
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
+
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '500'))
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5'))
+COMPRESS_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/xml', 'text/javascript',
+    'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+}
+STATIC_EXTENSIONS = ('.css', '.js', '.html', '.svg', '.txt', '.json', '.xml')
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+COMPRESSED_CACHE_MAX_ENTRIES = 256
+_compressed = OrderedDict()  # (etag, encoding) -> bytes
+_lock = threading.Lock()
+
+def _encode(data, encoding, static=False):
+    # Build-time compression of static files can afford the slowest, smallest settings
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if static else COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if static else COMPRESS_GZIP_LEVEL, mtime=0)
+
+def _accepted_encodings():
+    """Encodings we can produce that the client accepts, best first"""
+    accepted = request.accept_encodings
+    encodings = []
+    if brotli is not None and accepted['br']:
+        encodings.append('br')
+    if accepted['gzip']:
+        encodings.append('gzip')
+    return encodings
+
+def compress_response(response):
+    """after_request hook: compress dynamic text responses"""
+    if response.mimetype not in COMPRESS_MIMETYPES or response.direct_passthrough or response.is_streamed:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    encodings = _accepted_encodings()
+    if not encodings:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    encoding = encodings[0]
+    etag, weak = response.get_etag()
+    body = None
+    if etag:
+        body = _compressed.get((etag, encoding))
+    if body is None:
+        body = _encode(data, encoding)
+        if etag:
+            with _lock:
+                _compressed[(etag, encoding)] = body
+                while len(_compressed) > COMPRESSED_CACHE_MAX_ENTRIES:
+                    _compressed.popitem(last=False)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if etag and not weak:
+        # Same representation, different bytes: the validator is only weakly equal
+        response.set_etag(etag, weak=True)
+    return response
+
+def send_static(filename, **kwargs):
+    """send_from_directory for static/, preferring a precompressed sibling"""
+    if filename.endswith(STATIC_EXTENSIONS):
+        source = os.path.join(STATIC_FOLDER, filename)
+        for encoding in _accepted_encodings():
+            suffix = dict(PRECOMPRESSED)[encoding]
+            try:
+                fresh = os.stat(source + suffix).st_mtime_ns >= os.stat(source).st_mtime_ns
+            except OSError:
+                continue
+            if fresh:
+                response = send_from_directory(
+                    STATIC_FOLDER, filename + suffix,
+                    mimetype=mimetypes.guess_type(filename)[0], **kwargs
+                )
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+    response = send_from_directory(STATIC_FOLDER, filename, **kwargs)
+    if filename.endswith(STATIC_EXTENSIONS):
+        response.vary.add('Accept-Encoding')
+    return response
+
+def precompress_static(force=False):
+    """Write .gz/.br siblings for static text files; returns the number written"""
+    written = 0
+    for root, _, files in os.walk(STATIC_FOLDER):
+        for name in files:
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            source_mtime = os.stat(source).st_mtime_ns
+            data = None
+            for encoding, suffix in PRECOMPRESSED:
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = source + suffix
+                if not force and os.path.exists(target) and os.stat(target).st_mtime_ns >= source_mtime:
+                    continue
+                if data is None:
+                    with open(source, 'rb') as f:
+                        data = f.read()
+                body = _encode(data, encoding, static=True)
+                # Not worth serving if it doesn't get smaller
+                if len(body) >= len(data):
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+                with open(target + '.tmp', 'wb') as f:
+                    f.write(body)
+                os.replace(target + '.tmp', target)
+                written += 1
+    return written
+
+if __name__ == '__main__':
+    import sys
+    written = precompress_static(force='--force' in sys.argv)
+    print(f"Precompressed {written} static file(s)" + ('' if brotli else ' (gzip only; pip install brotli for .br)'))
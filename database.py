@@ -1,75 +1,187 @@
 import sqlite3
-import json
 import os
-from datetime import datetime
+import re
+import threading
+import time
+from html import unescape
 
 # Get the absolute path to the database
 # This ensures the database works both locally and on PythonAnywhere
+# DATABASE_PATH in the environment points elsewhere (e.g. bench.py's scratch databases)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATABASE_PATH = os.path.join(BASE_DIR, 'portfolio.db')
+DATABASE_PATH = os.environ.get('DATABASE_PATH') or os.path.join(BASE_DIR, 'portfolio.db')
 
-def get_db_connection():
-    """Create database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
+# Pragmas applied once to every pooled connection.
+# WAL lets public page reads carry on while an admin write is in progress,
+# and synchronous=NORMAL is durable enough in WAL mode without an fsync per commit.
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 64 * 1024 * 1024),
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000),
+)
+STATEMENT_CACHE_SIZE = 256
+
+# One connection per worker thread, reused across requests
+_local = threading.local()
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+def strip_html(text):
+    """Plain text of an HTML fragment (used to index full_description)"""
+    if not text:
+        return text
+    return ' '.join(unescape(_TAG_RE.sub(' ', text)).split())
+
+# Per-thread count and total time of statements run through TimedConnection
+# (read by metrics.py); each thread only touches its own counters, so no lock
+_query_stats = threading.local()
+
+def get_query_stats():
+    """Get (queries, seconds) run by this thread so far"""
+    return getattr(_query_stats, 'count', 0), getattr(_query_stats, 'seconds', 0.0)
+
+def _record_query(started):
+    _query_stats.count = getattr(_query_stats, 'count', 0) + 1
+    _query_stats.seconds = getattr(_query_stats, 'seconds', 0.0) + time.perf_counter() - started
+
+class TimedConnection(sqlite3.Connection):
+    """Connection that counts and times every statement it executes"""
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            _record_query(started)
+    
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args, **kwargs)
+        finally:
+            _record_query(started)
+    
+    def executescript(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executescript(*args, **kwargs)
+        finally:
+            _record_query(started)
+
+def _connect():
+    """Open and configure a new database connection"""
+    conn = sqlite3.connect(DATABASE_PATH, cached_statements=STATEMENT_CACHE_SIZE, factory=TimedConnection)
     conn.row_factory = sqlite3.Row
+    for name, value in SQLITE_PRAGMAS:
+        conn.execute(f'PRAGMA {name} = {value}')
+    # The search index triggers call strip_html(), so every connection that
+    # writes to projects must go through here
+    conn.create_function('strip_html', 1, strip_html, deterministic=True)
     return conn
 
-def init_db():
-    """Initialize the database with tables"""
+def get_db_connection():
+    """Get this thread's database connection, opening it on first use"""
+    conn = getattr(_local, 'conn', None)
+    # A connection must never be shared with a forked worker process
+    if conn is None or _local.pid != os.getpid():
+        conn = _connect()
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+def close_db_connection(exception=None):
+    """Release this thread's connection at the end of a request.
+
+    Registered as a Flask app context teardown. The connection stays open for
+    the next request on this thread; an unfinished transaction is rolled back,
+    and after an error the connection is dropped so the next request starts clean.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        return
+    if conn.in_transaction:
+        conn.rollback()
+    if exception is not None:
+        conn.close()
+        _local.conn = None
+
+def bump_content_version(conn):
+    """Mark site content as changed; call inside the write's transaction"""
+    conn.execute(
+        'UPDATE content_version SET generation = generation + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1'
+    )
+
+_seen_generation = None
+
+def get_content_version():
+    """Get the current (generation, updated_at) of site content.
+
+    Also drops this process's in-process caches when another process
+    has written since the last check.
+    """
+    global _seen_generation
     conn = get_db_connection()
-    
-    # Create projects table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            category TEXT NOT NULL,
-            description TEXT,
-            full_description TEXT,
-            technologies TEXT,
-            image_url TEXT,
-            screenshots TEXT,
-            project_url TEXT,
-            github_url TEXT,
-            featured BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create categories table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS categories (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            icon TEXT,
-            icon_image TEXT,
-            color TEXT,
-            is_listed BOOLEAN DEFAULT 1,
-            sort_order INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Migration: Add icon_image column if it doesn't exist
-    cursor = conn.cursor()
-    cursor.execute("PRAGMA table_info(categories)")
-    columns = [column[1] for column in cursor.fetchall()]
-    if 'icon_image' not in columns:
-        conn.execute("ALTER TABLE categories ADD COLUMN icon_image TEXT")
-    
-    # Create admin users table
+    row = conn.execute(
+        'SELECT generation, updated_at FROM content_version WHERE id = 1'
+    ).fetchone()
+    generation, updated_at = (row['generation'], row['updated_at']) if row else (0, None)
+    if generation != _seen_generation:
+        invalidate_category_cache()
+        invalidate_image_derivative_cache()
+        invalidate_image_metadata_cache()
+        invalidate_tag_cache()
+        _seen_generation = generation
+    return generation, updated_at
+
+def rebuild_search_index(conn):
+    """Re-index every project (the triggers keep it current afterwards)"""
+    conn.execute('DELETE FROM projects_fts')
     conn.execute('''
-        CREATE TABLE IF NOT EXISTS admin_users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+        INSERT INTO projects_fts (rowid, title, description, full_description, technologies)
+        SELECT id, title, description, strip_html(full_description), technologies FROM projects
     ''')
-    
-    conn.commit()
-    conn.close()
-    print("Database initialized successfully!")
+
+def split_list(value):
+    """Items of a comma-joined column, stripped, without empties"""
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+def tag_slug(name):
+    """URL slug for a technology tag ('C++' -> 'cplusplus', 'Adobe XD' -> 'adobe-xd')"""
+    name = name.lower().replace('+', 'plus').replace('#', 'sharp')
+    return re.sub(r'[^a-z0-9]+', '-', name).strip('-')
+
+def sync_project_tags(conn, project_id, technologies):
+    """Rewrite a project's project_tags rows from its technologies string"""
+    conn.execute('DELETE FROM project_tags WHERE project_id = ?', (project_id,))
+    rows, seen = [], set()
+    for name in split_list(technologies):
+        slug = tag_slug(name)
+        if not slug or slug in seen:
+            continue
+        seen.add(slug)
+        conn.execute('INSERT OR IGNORE INTO tags (slug, name) VALUES (?, ?)', (slug, name))
+        rows.append((project_id, len(rows), slug))
+    conn.executemany(
+        'INSERT INTO project_tags (project_id, tag_id, position) SELECT ?, id, ? FROM tags WHERE slug = ?',
+        rows
+    )
+
+def sync_project_images(conn, project_id, screenshots):
+    """Rewrite a project's project_images rows from its screenshots string"""
+    conn.execute('DELETE FROM project_images WHERE project_id = ?', (project_id,))
+    conn.executemany(
+        'INSERT INTO project_images (project_id, position, path) VALUES (?, ?, ?)',
+        [(project_id, position, path) for position, path in enumerate(split_list(screenshots))]
+    )
+
+def _delete_unused_tags(conn):
+    conn.execute('DELETE FROM tags WHERE id NOT IN (SELECT tag_id FROM project_tags)')
+
+def init_db():
+    """Bring the database schema up to date (see migrations.py)"""
+    from migrations import migrate
+    migrate(get_db_connection())
 
 def add_sample_projects():
     """Add some sample projects to get started"""
@@ -95,88 +207,435 @@ def add_sample_projects():
     ]
     
     for project in sample_projects:
-        conn.execute('''
+        cursor = conn.execute('''
             INSERT INTO projects (title, category, description, technologies, image_url, featured)
             VALUES (?, ?, ?, ?, ?, ?)
         ''', (project['title'], project['category'], project['description'], 
               project['technologies'], project['image_url'], project['featured']))
+        sync_project_tags(conn, cursor.lastrowid, project['technologies'])
+    
+    bump_content_version(conn)
     
     conn.commit()
-    conn.close()
+    invalidate_tag_cache()
     print("Sample projects added!")
 
 def get_all_projects():
     """Get all projects"""
     conn = get_db_connection()
-    projects = conn.execute('SELECT * FROM projects ORDER BY created_at DESC').fetchall()
-    conn.close()
+    projects = conn.execute('SELECT * FROM projects ORDER BY sort_order, id').fetchall()
     return projects
 
 def get_projects_by_category(category):
     """Get projects by category"""
     conn = get_db_connection()
     projects = conn.execute(
-        'SELECT * FROM projects WHERE category = ? ORDER BY created_at DESC',
+        'SELECT * FROM projects WHERE category = ? ORDER BY sort_order, id',
         (category,)
     ).fetchall()
-    conn.close()
     return projects
 
+# Columns needed to render project cards and dashboard rows
+# (leaves out the large full_description HTML)
+LISTING_COLUMNS = 'id, title, category, description, technologies, image_url, featured, created_at, processing_status, row_version, sort_order'
+PROJECTS_PER_PAGE = 24
+
+def encode_cursor(project):
+    """Opaque pagination cursor for a listing row"""
+    return f"{project['sort_order']}|{project['id']}"
+
+def decode_cursor(cursor):
+    """Parse a cursor from encode_cursor; None if missing or malformed"""
+    try:
+        sort_order, project_id = cursor.split('|')
+        return int(sort_order), int(project_id)
+    except (AttributeError, ValueError):
+        return None
+
+def get_projects_page(category=None, after=None, before=None, limit=PROJECTS_PER_PAGE, tag=None,
+                      listed_only=False, columns=LISTING_COLUMNS):
+    """Get one page of listing rows in sort_order, using keyset pagination.
+
+    Pass the next/prev cursor of the current page as after/before to move
+    forwards/backwards. limit=None returns every remaining row. tag (a tag
+    id) restricts the listing to that tag's projects; listed_only leaves out
+    projects in unlisted categories. columns must include id and sort_order.
+    Returns (projects, next_cursor, prev_cursor).
+    """
+    backwards = decode_cursor(before) is not None
+    cursor = decode_cursor(before) if backwards else decode_cursor(after)
+    
+    where, params = [], []
+    if category is not None:
+        where.append('category = ?')
+        params.append(category)
+    if tag is not None:
+        where.append('id IN (SELECT project_id FROM project_tags WHERE tag_id = ?)')
+        params.append(tag)
+    if listed_only:
+        where.append('category IN (SELECT id FROM categories WHERE is_listed = 1)')
+    if cursor:
+        where.append('(sort_order, id) < (?, ?)' if backwards else '(sort_order, id) > (?, ?)')
+        params.extend(cursor)
+    
+    sql = f'SELECT {columns} FROM projects'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY sort_order DESC, id DESC' if backwards else ' ORDER BY sort_order ASC, id ASC'
+    if limit is not None:
+        # One extra row tells us whether there is another page
+        sql += ' LIMIT ?'
+        params.append(limit + 1)
+    
+    conn = get_db_connection()
+    projects = conn.execute(sql, params).fetchall()
+    has_more = limit is not None and len(projects) > limit
+    projects = projects[:limit]
+    if backwards:
+        projects.reverse()
+    
+    if not projects:
+        return projects, None, None
+    next_cursor = encode_cursor(projects[-1]) if (backwards or has_more) else None
+    prev_cursor = encode_cursor(projects[0]) if (has_more if backwards else cursor) else None
+    return projects, next_cursor, prev_cursor
+
+def count_projects(category=None):
+    """Count projects, optionally in one category (answered from the index)"""
+    conn = get_db_connection()
+    if category is None:
+        return conn.execute('SELECT COUNT(*) FROM projects').fetchone()[0]
+    return conn.execute('SELECT COUNT(*) FROM projects WHERE category = ?', (category,)).fetchone()[0]
+
+# Markers that can't occur in project text; swapped for <mark> after escaping
+_HL_START, _HL_END = '\x02', '\x03'
+
+def _fts_query(text):
+    """Turn free text into a safe FTS5 query: every word, prefix-matched"""
+    words = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{word}"*' for word in words[:16])
+
+def _highlight_html(text):
+    from markupsafe import escape
+    return str(escape(text or '')).replace(_HL_START, '<mark>').replace(_HL_END, '</mark>')
+
+def search_projects(text, limit=10, offset=0):
+    """Ranked full-text search over listed projects.
+
+    Returns (results, total); each result has highlighted title_html and
+    snippet_html (HTML-escaped apart from the <mark> tags).
+    """
+    query = _fts_query(text)
+    if not query:
+        return [], 0
+    conn = get_db_connection()
+    base = '''
+        FROM projects_fts
+        JOIN projects p ON p.id = projects_fts.rowid
+        JOIN categories c ON c.id = p.category AND c.is_listed = 1
+        WHERE projects_fts MATCH ?
+    '''
+    total = conn.execute('SELECT COUNT(*) ' + base, (query,)).fetchone()[0]
+    rows = conn.execute(f'''
+        SELECT p.id, p.title, p.category, p.description, p.image_url,
+               highlight(projects_fts, 0, ?, ?) AS title_hl,
+               snippet(projects_fts, -1, ?, ?, '…', 24) AS snippet_hl
+        {base}
+        ORDER BY bm25(projects_fts, 10.0, 4.0, 1.0, 6.0)
+        LIMIT ? OFFSET ?
+    ''', (_HL_START, _HL_END, _HL_START, _HL_END, query, limit, offset)).fetchall()
+    
+    results = []
+    for row in rows:
+        results.append({
+            'id': row['id'],
+            'title': row['title'],
+            'category': row['category'],
+            'description': row['description'],
+            'image_url': row['image_url'],
+            'title_html': _highlight_html(row['title_hl']),
+            'snippet_html': _highlight_html(row['snippet_hl']),
+        })
+    return results, total
+
 def get_project_by_id(project_id):
     """Get a single project by ID"""
     conn = get_db_connection()
     project = conn.execute('SELECT * FROM projects WHERE id = ?', (project_id,)).fetchone()
-    conn.close()
     return project
 
-def add_project(title, category, description, technologies, image_url, project_url='', github_url='', featured=0, full_description='', screenshots=''):
-    """Add a new project"""
+def get_project_tags(project_ids):
+    """Get {project id: [tag rows in display order]} with a single query"""
+    project_ids = list(project_ids)
+    if not project_ids:
+        return {}
     conn = get_db_connection()
-    conn.execute('''
-        INSERT INTO projects (title, category, description, full_description, technologies, image_url, screenshots, project_url, github_url, featured)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (title, category, description, full_description, technologies, image_url, screenshots, project_url, github_url, featured))
+    placeholders = ','.join('?' * len(project_ids))
+    rows = conn.execute(f'''
+        SELECT pt.project_id, t.slug, t.name
+        FROM project_tags pt JOIN tags t ON t.id = pt.tag_id
+        WHERE pt.project_id IN ({placeholders})
+        ORDER BY pt.project_id, pt.position
+    ''', project_ids).fetchall()
+    tags = {project_id: [] for project_id in project_ids}
+    for row in rows:
+        tags[row['project_id']].append(row)
+    return tags
+
+def get_project_images(project_ids):
+    """Get {project id: [screenshot paths in display order]} with a single query"""
+    project_ids = list(project_ids)
+    if not project_ids:
+        return {}
+    conn = get_db_connection()
+    placeholders = ','.join('?' * len(project_ids))
+    rows = conn.execute(f'''
+        SELECT project_id, path FROM project_images
+        WHERE project_id IN ({placeholders})
+        ORDER BY project_id, position
+    ''', project_ids).fetchall()
+    images = {project_id: [] for project_id in project_ids}
+    for row in rows:
+        images[row['project_id']].append(row['path'])
+    return images
+
+def get_projects_by_ids(project_ids, columns=LISTING_COLUMNS):
+    """Get projects in listed categories by id with a single query, in the order given"""
+    project_ids = list(dict.fromkeys(project_ids))
+    if not project_ids:
+        return []
+    conn = get_db_connection()
+    placeholders = ','.join('?' * len(project_ids))
+    rows = conn.execute(f'''
+        SELECT {columns} FROM projects
+        WHERE id IN ({placeholders})
+          AND category IN (SELECT id FROM categories WHERE is_listed = 1)
+    ''', project_ids).fetchall()
+    by_id = {row['id']: row for row in rows}
+    return [by_id[project_id] for project_id in project_ids if project_id in by_id]
+
+def get_tag_by_slug(slug):
+    """Get a single tag by its slug"""
+    conn = get_db_connection()
+    return conn.execute('SELECT * FROM tags WHERE slug = ?', (slug,)).fetchone()
+
+# Project counts per tag (listed categories only), computed once per content change
+_tag_counts_cache = None
+
+def invalidate_tag_cache():
+    """Drop the cached tag counts so the next lookup recomputes them"""
+    global _tag_counts_cache
+    _tag_counts_cache = None
+
+def get_tag_counts():
+    """Get tags with their number of listed projects, most used first"""
+    global _tag_counts_cache
+    counts = _tag_counts_cache
+    if counts is None:
+        conn = get_db_connection()
+        counts = conn.execute('''
+            SELECT t.id, t.slug, t.name, COUNT(*) AS count
+            FROM project_tags pt
+            JOIN tags t ON t.id = pt.tag_id
+            JOIN projects p ON p.id = pt.project_id
+            JOIN categories c ON c.id = p.category AND c.is_listed = 1
+            GROUP BY t.id
+            ORDER BY count DESC, t.name
+        ''').fetchall()
+        _tag_counts_cache = counts
+    return list(counts)
+
+def _project_image_paths(image_url, screenshots):
+    """All image paths a project row refers to"""
+    return [path for path in [image_url] + (screenshots or '').split(',') if path]
+
+def _adjust_blob_refs(conn, old_paths=(), new_paths=()):
+    """Move blob reference counts from old_paths to new_paths (non-blob paths are ignored)"""
+    for paths, delta in ((old_paths, -1), (new_paths, 1)):
+        conn.executemany(
+            'UPDATE blobs SET ref_count = MAX(ref_count + ?, 0) WHERE path = ?',
+            [(delta, path) for path in paths if path]
+        )
+
+def register_blob(digest, path, size):
+    """Record a stored blob (no-op if it is already known)"""
+    conn = get_db_connection()
+    cursor = conn.execute(
+        'INSERT OR IGNORE INTO blobs (path, digest, size) VALUES (?, ?, ?)',
+        (path, digest, size)
+    )
+    if cursor.rowcount:
+        bump_content_version(conn)
     conn.commit()
-    conn.close()
+
+def get_known_blobs(paths):
+    """The subset of paths that are stored blobs"""
+    paths = [path for path in paths if path]
+    if not paths:
+        return set()
+    conn = get_db_connection()
+    placeholders = ','.join('?' * len(paths))
+    return {row['path'] for row in conn.execute(f'SELECT path FROM blobs WHERE path IN ({placeholders})', paths)}
+
+def add_project(title, category, description, technologies, image_url, project_url='', github_url='', featured=0, full_description='', screenshots='', processing_status='ready'):
+    """Add a new project and return its id"""
+    conn = get_db_connection()
+    cursor = conn.execute('''
+        INSERT INTO projects (title, category, description, full_description, technologies, image_url, screenshots, project_url, github_url, featured, processing_status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (title, category, description, full_description, technologies, image_url, screenshots, project_url, github_url, featured, processing_status))
+    sync_project_tags(conn, cursor.lastrowid, technologies)
+    sync_project_images(conn, cursor.lastrowid, screenshots)
+    _adjust_blob_refs(conn, new_paths=_project_image_paths(image_url, screenshots))
+    bump_content_version(conn)
+    conn.commit()
+    invalidate_tag_cache()
+    return cursor.lastrowid
 
 def update_project(project_id, title, category, description, technologies, image_url, project_url='', github_url='', featured=0, full_description='', screenshots=''):
     """Update an existing project"""
     conn = get_db_connection()
+    old = conn.execute('SELECT image_url, screenshots FROM projects WHERE id = ?', (project_id,)).fetchone()
     conn.execute('''
-        UPDATE projects 
+        UPDATE projects
         SET title=?, category=?, description=?, full_description=?, technologies=?, image_url=?, screenshots=?, project_url=?, github_url=?, featured=?
         WHERE id=?
     ''', (title, category, description, full_description, technologies, image_url, screenshots, project_url, github_url, featured, project_id))
+    sync_project_tags(conn, project_id, technologies)
+    sync_project_images(conn, project_id, screenshots)
+    _delete_unused_tags(conn)
+    if old:
+        _adjust_blob_refs(conn, _project_image_paths(old['image_url'], old['screenshots']),
+                          _project_image_paths(image_url, screenshots))
+    bump_content_version(conn)
     conn.commit()
-    conn.close()
+    invalidate_tag_cache()
 
-def get_all_categories():
-    """Get all categories ordered by sort_order"""
+# In-process cache of the categories table.
+# Categories are tiny and change only through the admin mutators below,
+# so they are read once and kept until one of those mutators runs.
+_category_cache = None  # (ordered rows, listed rows, id -> row) once loaded
+_category_cache_version = 0
+_category_cache_lock = threading.Lock()
+_category_cache_stats = {'hits': 0, 'misses': 0}
+
+def _get_category_cache():
+    """Return the cached categories, loading them on a miss"""
+    global _category_cache
+    cache = _category_cache
+    if cache is not None:
+        _category_cache_stats['hits'] += 1
+        return cache
+    
+    with _category_cache_lock:
+        _category_cache_stats['misses'] += 1
+        version = _category_cache_version
+    
     conn = get_db_connection()
-    categories = conn.execute(
+    rows = conn.execute(
         'SELECT * FROM categories ORDER BY sort_order ASC, name ASC'
     ).fetchall()
-    conn.close()
-    return categories
+    cache = (
+        rows,
+        [row for row in rows if row['is_listed']],
+        {row['id']: row for row in rows},
+    )
+    
+    with _category_cache_lock:
+        # Don't publish rows read before a concurrent invalidation
+        if version == _category_cache_version:
+            _category_cache = cache
+    return cache
+
+def invalidate_category_cache():
+    """Drop cached categories so the next lookup re-reads them"""
+    global _category_cache, _category_cache_version
+    with _category_cache_lock:
+        _category_cache_version += 1
+        _category_cache = None
+
+def get_category_cache_stats():
+    """Get category cache hit/miss counters"""
+    return dict(_category_cache_stats, loaded=_category_cache is not None)
+
+def set_project_markdown(project_id, source):
+    """Store a project's README markdown (None to stop rendering from markdown).
+
+    The rendered HTML is filled in separately, see markdown_render.py.
+    """
+    conn = get_db_connection()
+    conn.execute(
+        'UPDATE projects SET readme_markdown = ?, markdown_key = NULL WHERE id = ?',
+        (source, project_id)
+    )
+    bump_content_version(conn)
+    conn.commit()
+
+def get_markdown_projects(project_ids=None):
+    """Get (id, readme_markdown, markdown_key) of projects rendered from markdown"""
+    conn = get_db_connection()
+    sql = 'SELECT id, readme_markdown, markdown_key FROM projects WHERE readme_markdown IS NOT NULL'
+    params = list(project_ids or ())
+    if project_ids is not None:
+        if not params:
+            return []
+        sql += f" AND id IN ({','.join('?' * len(params))})"
+    return conn.execute(sql, params).fetchall()
+
+def get_rendered_markdown(key):
+    """Get cached HTML for a markdown render key, or None"""
+    conn = get_db_connection()
+    row = conn.execute('SELECT html FROM rendered_markdown WHERE key = ?', (key,)).fetchone()
+    return row['html'] if row else None
+
+def store_rendered_markdown(renders):
+    """Cache rendered HTML; renders is an iterable of (key, html)"""
+    conn = get_db_connection()
+    conn.executemany('INSERT OR REPLACE INTO rendered_markdown (key, html) VALUES (?, ?)', renders)
+    conn.commit()
+
+def set_projects_rendered_markdown(updates):
+    """Publish rendered README HTML; updates is an iterable of (project id, key, html)"""
+    conn = get_db_connection()
+    cursor = conn.executemany(
+        'UPDATE projects SET full_description = ?, markdown_key = ? WHERE id = ?',
+        [(html, key, project_id) for project_id, key, html in updates]
+    )
+    if cursor.rowcount:
+        bump_content_version(conn)
+    conn.commit()
+
+def prune_rendered_markdown():
+    """Drop cached renders no project uses any more; returns how many"""
+    conn = get_db_connection()
+    deleted = conn.execute(
+        'DELETE FROM rendered_markdown WHERE key NOT IN '
+        '(SELECT markdown_key FROM projects WHERE markdown_key IS NOT NULL)'
+    ).rowcount
+    conn.commit()
+    return deleted
+
+def set_project_processing_status(project_id, status):
+    """Set a project's background processing status (pending/ready/failed)"""
+    conn = get_db_connection()
+    conn.execute(
+        'UPDATE projects SET processing_status = ? WHERE id = ?',
+        (status, project_id)
+    )
+    bump_content_version(conn)
+    conn.commit()
+
+def get_all_categories():
+    """Get all categories ordered by sort_order"""
+    return list(_get_category_cache()[0])
 
 def get_listed_categories():
     """Get only listed/visible categories"""
-    conn = get_db_connection()
-    categories = conn.execute(
-        'SELECT * FROM categories WHERE is_listed = 1 ORDER BY sort_order ASC, name ASC'
-    ).fetchall()
-    conn.close()
-    return categories
+    return list(_get_category_cache()[1])
 
 def get_category_by_id(category_id):
     """Get a single category by ID"""
-    conn = get_db_connection()
-    category = conn.execute(
-        'SELECT * FROM categories WHERE id = ?',
-        (category_id,)
-    ).fetchone()
-    conn.close()
-    return category
+    return _get_category_cache()[2].get(category_id)
 
 def toggle_category_visibility(category_id):
     """Toggle category visibility (list/unlist)"""
@@ -193,53 +652,57 @@ def toggle_category_visibility(category_id):
             'UPDATE categories SET is_listed = ? WHERE id = ?',
             (new_state, category_id)
         )
+        bump_content_version(conn)
         conn.commit()
-    conn.close()
+        invalidate_category_cache()
+        invalidate_tag_cache()
     return new_state if category else None
 
+DEFAULT_CATEGORIES = [
+    {'id': 'python', 'name': 'Python Projects', 'icon': '🐍', 'color': '#3776ab', 'sort_order': 1},
+    {'id': 'web', 'name': 'Web Development', 'icon': '🌐', 'color': '#e34f26', 'sort_order': 2},
+    {'id': 'java', 'name': 'Java Projects', 'icon': '☕', 'color': '#007396', 'sort_order': 3},
+    {'id': 'cpp', 'name': 'C++ Projects', 'icon': '⚡', 'color': '#00599c', 'sort_order': 4},
+    {'id': 'android', 'name': 'Android Apps', 'icon': '📱', 'color': '#3ddc84', 'sort_order': 5},
+    {'id': 'unity', 'name': 'Unity Games', 'icon': '🎮', 'color': '#000000', 'sort_order': 6},
+    {'id': 'blender', 'name': '3D Modeling', 'icon': '🎨', 'color': '#f5792a', 'sort_order': 7},
+    {'id': 'uxui', 'name': 'UX/UI Design', 'icon': '✨', 'color': '#ff6b6b', 'sort_order': 8}
+]
+
+def insert_default_categories(conn):
+    """Insert missing default categories; call inside a transaction. Returns how many were added"""
+    added = conn.executemany(
+        'INSERT OR IGNORE INTO categories (id, name, icon, color, is_listed, sort_order) VALUES (?, ?, ?, ?, 1, ?)',
+        [(cat['id'], cat['name'], cat['icon'], cat['color'], cat['sort_order']) for cat in DEFAULT_CATEGORIES]
+    ).rowcount
+    if added:
+        bump_content_version(conn)
+    return added
+
 def init_default_categories():
     """Initialize default categories if they don't exist"""
-    default_categories = [
-        {'id': 'python', 'name': 'Python Projects', 'icon': '🐍', 'color': '#3776ab', 'sort_order': 1},
-        {'id': 'web', 'name': 'Web Development', 'icon': '🌐', 'color': '#e34f26', 'sort_order': 2},
-        {'id': 'java', 'name': 'Java Projects', 'icon': '☕', 'color': '#007396', 'sort_order': 3},
-        {'id': 'cpp', 'name': 'C++ Projects', 'icon': '⚡', 'color': '#00599c', 'sort_order': 4},
-        {'id': 'android', 'name': 'Android Apps', 'icon': '📱', 'color': '#3ddc84', 'sort_order': 5},
-        {'id': 'unity', 'name': 'Unity Games', 'icon': '🎮', 'color': '#000000', 'sort_order': 6},
-        {'id': 'blender', 'name': '3D Modeling', 'icon': '🎨', 'color': '#f5792a', 'sort_order': 7},
-        {'id': 'uxui', 'name': 'UX/UI Design', 'icon': '✨', 'color': '#ff6b6b', 'sort_order': 8}
-    ]
-    
     conn = get_db_connection()
-    for cat in default_categories:
-        # Check if category exists
-        existing = conn.execute(
-            'SELECT id FROM categories WHERE id = ?',
-            (cat['id'],)
-        ).fetchone()
-        
-        if not existing:
-            conn.execute(
-                'INSERT INTO categories (id, name, icon, color, is_listed, sort_order) VALUES (?, ?, ?, ?, 1, ?)',
-                (cat['id'], cat['name'], cat['icon'], cat['color'], cat['sort_order'])
-            )
-    
+    added = insert_default_categories(conn)
     conn.commit()
-    conn.close()
+    if added:
+        invalidate_category_cache()
 
-def add_category(category_id, name, icon, color, sort_order=999, icon_image=None):
-    """Add a new category"""
+def add_category(category_id, name, icon, color, sort_order=None, icon_image=None):
+    """Add a new category (after the last one unless sort_order is given)"""
     conn = get_db_connection()
     try:
         conn.execute(
-            'INSERT INTO categories (id, name, icon, icon_image, color, is_listed, sort_order) VALUES (?, ?, ?, ?, ?, 1, ?)',
+            '''INSERT INTO categories (id, name, icon, icon_image, color, is_listed, sort_order)
+               VALUES (?, ?, ?, ?, ?, 1, COALESCE(?, (SELECT COALESCE(MAX(sort_order), 0) + 1 FROM categories)))''',
             (category_id, name, icon, icon_image, color, sort_order)
         )
+        _adjust_blob_refs(conn, new_paths=[icon_image])
+        bump_content_version(conn)
         conn.commit()
-        conn.close()
+        invalidate_category_cache()
         return True
     except Exception as e:
-        conn.close()
+        conn.rollback()
         return False
 
 def update_category(category_id, name, icon, color, icon_image=None):
@@ -248,6 +711,9 @@ def update_category(category_id, name, icon, color, icon_image=None):
     try:
         if icon_image is not None:
             # Update with new image
+            old = conn.execute('SELECT icon_image FROM categories WHERE id = ?', (category_id,)).fetchone()
+            if old:
+                _adjust_blob_refs(conn, [old['icon_image']], [icon_image])
             conn.execute(
                 'UPDATE categories SET name = ?, icon = ?, icon_image = ?, color = ? WHERE id = ?',
                 (name, icon, icon_image, color, category_id)
@@ -258,40 +724,239 @@ def update_category(category_id, name, icon, color, icon_image=None):
                 'UPDATE categories SET name = ?, icon = ?, color = ? WHERE id = ?',
                 (name, icon, color, category_id)
             )
+        bump_content_version(conn)
         conn.commit()
-        conn.close()
+        invalidate_category_cache()
         return True
     except Exception as e:
-        conn.close()
+        conn.rollback()
         return False
 
 def delete_category(category_id):
-    """Delete a category and update projects using it to NULL"""
+    """Delete a category; ValueError if projects still use it"""
     conn = get_db_connection()
-    # First check if any projects use this category
-    projects_count = conn.execute(
-        'SELECT COUNT(*) as count FROM projects WHERE category = ?',
-        (category_id,)
-    ).fetchone()['count']
-    
-    # Update projects to have NULL category
-    conn.execute(
-        'UPDATE projects SET category = NULL WHERE category = ?',
-        (category_id,)
-    )
-    
-    # Delete the category
-    conn.execute('DELETE FROM categories WHERE id = ?', (category_id,))
+    _delete_categories(conn, [category_id])
+    bump_content_version(conn)
     conn.commit()
-    conn.close()
-    return projects_count
+    invalidate_category_cache()
+    invalidate_tag_cache()
 
 def delete_project(project_id):
     """Delete a project"""
     conn = get_db_connection()
-    conn.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+    _delete_projects(conn, [project_id])
+    bump_content_version(conn)
+    conn.commit()
+    invalidate_tag_cache()
+
+# Admin bulk operations. Each takes the ids to act on and returns a count
+# for the admin to report; apply_admin_operations runs a batch of them in
+# one transaction.
+
+def _delete_projects(conn, ids):
+    placeholders = ','.join('?' * len(ids))
+    old_paths = [
+        path
+        for row in conn.execute(f'SELECT image_url, screenshots FROM projects WHERE id IN ({placeholders})', ids)
+        for path in _project_image_paths(row['image_url'], row['screenshots'])
+    ]
+    _adjust_blob_refs(conn, old_paths=old_paths)
+    deleted = conn.execute(f'DELETE FROM projects WHERE id IN ({placeholders})', ids).rowcount
+    conn.execute(f'DELETE FROM project_tags WHERE project_id IN ({placeholders})', ids)
+    conn.execute(f'DELETE FROM project_images WHERE project_id IN ({placeholders})', ids)
+    _delete_unused_tags(conn)
+    return deleted
+
+def _set_projects_featured(featured):
+    def apply(conn, ids):
+        placeholders = ','.join('?' * len(ids))
+        return conn.execute(f'UPDATE projects SET featured = ? WHERE id IN ({placeholders})', [featured, *ids]).rowcount
+    return apply
+
+def _move_projects(conn, ids, category):
+    if not isinstance(category, str):
+        raise ValueError('move_projects: category must be a category id')
+    if conn.execute('SELECT 1 FROM categories WHERE id = ?', (category,)).fetchone() is None:
+        raise ValueError(f'Unknown category: {category}')
+    placeholders = ','.join('?' * len(ids))
+    return conn.execute(f'UPDATE projects SET category = ? WHERE id IN ({placeholders})', [category, *ids]).rowcount
+
+def _set_categories_listed(listed):
+    def apply(conn, ids):
+        placeholders = ','.join('?' * len(ids))
+        return conn.execute(f'UPDATE categories SET is_listed = ? WHERE id IN ({placeholders})', [listed, *ids]).rowcount
+    return apply
+
+def _delete_categories(conn, ids):
+    """Delete categories no project uses (projects.category is NOT NULL)"""
+    placeholders = ','.join('?' * len(ids))
+    in_use = conn.execute(
+        f'SELECT category, COUNT(*) FROM projects WHERE category IN ({placeholders}) GROUP BY category', ids
+    ).fetchall()
+    if in_use:
+        raise ValueError('; '.join(f'Category {category} has {count} project(s)' for category, count in in_use)
+                         + '; move them to another category first')
+    icons = [row['icon_image'] for row in conn.execute(f'SELECT icon_image FROM categories WHERE id IN ({placeholders})', ids)]
+    _adjust_blob_refs(conn, old_paths=icons)
+    return conn.execute(f'DELETE FROM categories WHERE id IN ({placeholders})', ids).rowcount
+
+def _renumber(conn, table):
+    """Give every row of table a distinct sort_order (1, 2, ...), keeping the displayed order"""
+    ids = [row[0] for row in conn.execute(f'SELECT id FROM {table} ORDER BY sort_order, id')]
+    conn.executemany(f'UPDATE {table} SET sort_order = ? WHERE id = ?', enumerate(ids, 1))
+
+def _reorder(table):
+    def apply(conn, ids):
+        """Put ids in the given order, using the sort_order slots they already occupy.
+
+        Only the listed rows change, so dragging one project within a page
+        of a large catalog rewrites that page, not the table.
+        """
+        placeholders = ','.join('?' * len(ids))
+
+        def slots():
+            return [row[0] for row in conn.execute(
+                f'SELECT sort_order FROM {table} WHERE id IN ({placeholders}) ORDER BY sort_order', ids
+            )]
+
+        current = slots()
+        if len(current) != len(ids):
+            raise ValueError(f'Unknown id in {table} order')
+        # A slot shared with another row (e.g. categories added with the same
+        # sort_order) can't be handed out alone; renumber the table once so
+        # every row has its own
+        shared = conn.execute(
+            f'SELECT COUNT(*) FROM {table} WHERE sort_order IN ({",".join("?" * len(current))})', current
+        ).fetchone()[0]
+        if None in current or len(set(current)) < len(current) or shared > len(current):
+            _renumber(conn, table)
+            current = slots()
+        conn.executemany(f'UPDATE {table} SET sort_order = ? WHERE id = ?', zip(current, ids))
+        return len(ids)
+    return apply
+
+# op -> (function(conn, ids, **arguments), id type, argument names)
+ADMIN_OPERATIONS = {
+    'delete_projects': (_delete_projects, int, ()),
+    'feature_projects': (_set_projects_featured(1), int, ()),
+    'unfeature_projects': (_set_projects_featured(0), int, ()),
+    'move_projects': (_move_projects, int, ('category',)),
+    'reorder_projects': (_reorder('projects'), int, ()),
+    'list_categories': (_set_categories_listed(1), str, ()),
+    'unlist_categories': (_set_categories_listed(0), str, ()),
+    'delete_categories': (_delete_categories, str, ()),
+    'reorder_categories': (_reorder('categories'), str, ()),
+}
+
+def apply_admin_operations(operations):
+    """Apply a batch of admin edits in one transaction; returns each one's count.
+
+    Each operation is {'op': <ADMIN_OPERATIONS key>, 'ids': [...], ...arguments},
+    e.g. {'op': 'move_projects', 'ids': [3, 5], 'category': 'web'}; reorders
+    list ids in their new order. Operations run in order, and if any of
+    them is invalid (ValueError) none are applied.
+    """
+    conn = get_db_connection()
+    results = []
+    try:
+        for operation in operations:
+            if not isinstance(operation, dict) or operation.get('op') not in ADMIN_OPERATIONS:
+                raise ValueError(f"Unknown operation: {operation.get('op') if isinstance(operation, dict) else operation!r}")
+            apply, id_type, argument_names = ADMIN_OPERATIONS[operation['op']]
+            ids = operation.get('ids')
+            if not isinstance(ids, list) or not ids:
+                raise ValueError(f"{operation['op']}: ids must be a non-empty list")
+            try:
+                ids = list(dict.fromkeys(id_type(i) for i in ids))
+            except (TypeError, ValueError):
+                raise ValueError(f"{operation['op']}: invalid id")
+            arguments = {name: operation.get(name) for name in argument_names}
+            if None in arguments.values():
+                raise ValueError(f"{operation['op']} needs {', '.join(argument_names)}")
+            results.append(apply(conn, ids, **arguments))
+        bump_content_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_category_cache()
+    invalidate_tag_cache()
+    return results
+
+# source path -> {format: [rows ordered by width]}, loaded on first use
+_image_derivative_cache = None
+
+def invalidate_image_derivative_cache():
+    """Drop cached derivative lookups so the next one re-reads them"""
+    global _image_derivative_cache
+    _image_derivative_cache = None
+
+def get_image_derivatives(source):
+    """Get {format: [derivative rows by width]} for an image under static/images"""
+    global _image_derivative_cache
+    cache = _image_derivative_cache
+    if cache is None:
+        conn = get_db_connection()
+        rows = conn.execute(
+            'SELECT * FROM image_derivatives ORDER BY source, format, width'
+        ).fetchall()
+        cache = {}
+        for row in rows:
+            cache.setdefault(row['source'], {}).setdefault(row['format'], []).append(row)
+        _image_derivative_cache = cache
+    return cache.get(source, {})
+
+def _touch_projects_using(conn, image):
+    """Start a new row version of the projects whose main image is `image`.
+
+    Any UPDATE does; the projects_touch trigger (migrations.py) bumps row_version.
+    """
+    conn.execute('UPDATE projects SET image_url = image_url WHERE image_url = ?', (image,))
+
+def set_image_derivatives(source, derivatives):
+    """Replace the recorded derivatives of an image"""
+    conn = get_db_connection()
+    conn.execute('DELETE FROM image_derivatives WHERE source = ?', (source,))
+    conn.executemany(
+        'INSERT INTO image_derivatives (source, format, width, height, path) VALUES (?, ?, ?, ?, ?)',
+        [(source, d['format'], d['width'], d['height'], d['path']) for d in derivatives]
+    )
+    # Cards showing this image render differently now
+    _touch_projects_using(conn, source)
+    bump_content_version(conn)
+    conn.commit()
+    invalidate_image_derivative_cache()
+
+# source path -> metadata row, loaded on first use
+_image_metadata_cache = None
+
+def invalidate_image_metadata_cache():
+    """Drop cached image metadata so the next lookup re-reads it"""
+    global _image_metadata_cache
+    _image_metadata_cache = None
+
+def get_image_metadata(source):
+    """Get the width/height/color/placeholder row of an image under static/images, or None"""
+    global _image_metadata_cache
+    cache = _image_metadata_cache
+    if cache is None:
+        conn = get_db_connection()
+        cache = {row['source']: row for row in conn.execute('SELECT * FROM image_metadata')}
+        _image_metadata_cache = cache
+    return cache.get(source)
+
+def set_image_metadata(source, metadata):
+    """Record an image's metadata (a dict of width, height, color, placeholder)"""
+    conn = get_db_connection()
+    conn.execute(
+        'INSERT OR REPLACE INTO image_metadata (source, width, height, color, placeholder) VALUES (?, ?, ?, ?, ?)',
+        (source, metadata['width'], metadata['height'], metadata['color'], metadata['placeholder'])
+    )
+    # Cards showing this image render differently now
+    _touch_projects_using(conn, source)
+    bump_content_version(conn)
     conn.commit()
-    conn.close()
+    invalidate_image_metadata_cache()
 
 if __name__ == '__main__':
     init_db()
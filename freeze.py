@@ -0,0 +1,258 @@
+"""
+Static site export
+Pre-renders every public page to plain HTML so the site can be served
+by any static web server, with no Python on the request path.
+
+Use: python freeze.py [--output build] [--jobs 4] [--full]
+
+Pages are written as <path>/index.html (e.g. /about -> about/index.html),
+so the web server should fall back to index.html for directories
+(nginx: try_files $uri $uri/index.html =404). The static/ folder is
+mirrored next to the pages.
+
+Exports are incremental: a fingerprint of the data behind each page is
+kept in <output>/.freeze-state.json, and only pages whose projects (with
+their tags, screenshots and image derivatives/metadata), categories or
+templates changed since the last run are rendered again.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+STATE_FILE = '.freeze-state.json'
+
+def _digest(*parts):
+    """Stable short hash of rows and strings"""
+    h = hashlib.sha256()
+    for part in parts:
+        if hasattr(part, 'keys'):
+            part = [part[key] for key in part.keys()]
+        h.update(json.dumps(part, default=str, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()[:20]
+
+def _code_digest():
+    """Hash of everything besides data that shapes the pages"""
+    h = hashlib.sha256()
+    # The footer shows the current year
+    h.update(str(datetime.now().year).encode('ascii'))
+    for root, _, files in sorted(os.walk(TEMPLATES_DIR)):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                h.update(f.read())
+    with open(os.path.join(BASE_DIR, 'app.py'), 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()[:20]
+
+def output_path(url):
+    """Map a route to the file it is exported to"""
+    path = url.strip('/')
+    return os.path.join(path, 'index.html') if path else 'index.html'
+
+def _image_state(path):
+    """The derivative and metadata rows responsive_img renders an image from"""
+    from database import get_image_derivatives, get_image_metadata
+
+    derivatives = get_image_derivatives(path) if path else {}
+    metadata = get_image_metadata(path) if path else None
+    return (
+        {fmt: [tuple(row) for row in rows] for fmt, rows in derivatives.items()},
+        tuple(metadata) if metadata else None,
+    )
+
+def _project_extras(projects):
+    """{project id: digest of what its card and page show besides its row}
+
+    Tags, screenshots and the images' derivatives and metadata live in
+    other tables, so they are hashed alongside the project row.
+    """
+    from database import get_project_images, get_project_tags
+
+    ids = [project['id'] for project in projects]
+    tags = get_project_tags(ids)
+    images = get_project_images(ids)
+    extras = {}
+    for project in projects:
+        paths = [project['image_url'], *images[project['id']]]
+        extras[project['id']] = _digest(
+            [tuple(tag) for tag in tags[project['id']]],
+            paths,
+            [_image_state(path) for path in paths],
+        )
+    return extras
+
+def collect_pages():
+    """Return {url: fingerprint} for every public page"""
+    from database import get_listed_categories, get_projects_by_category, get_all_projects, get_category_by_id, get_projects_page, get_tag_counts
+
+    code = _code_digest()
+    all_projects = get_all_projects()
+    extras = _project_extras(all_projects)
+    categories = get_listed_categories()
+    tag_counts = get_tag_counts()
+    pages = {
+        '/': _digest(code),
+        '/about': _digest(code),
+        '/contact': _digest(code),
+        '/portfolio': _digest(code, *categories, *tag_counts),
+    }
+    for category in categories:
+        projects = get_projects_by_category(category['id'])
+        pages[f"/portfolio/{category['id']}"] = _digest(code, category, *projects, [extras[p['id']] for p in projects])
+    
+    for tag in tag_counts:
+        projects, _, _ = get_projects_page(tag=tag['id'], listed_only=True, limit=None)
+        pages[f"/portfolio/tag/{tag['slug']}"] = _digest(code, tag, *projects, [extras[p['id']] for p in projects])
+
+    for project in all_projects:
+        category = get_category_by_id(project['category'])
+        # Project pages need their category for the back link
+        if category is None:
+            continue
+        pages[f"/project/{project['id']}"] = _digest(code, project, category, extras[project['id']])
+    return pages
+
+_client = None
+
+def _init_worker():
+    global _client
+    from app import app
+    # Static pages cost nothing per request, so category pages list every project
+    app.config['PROJECTS_PER_PAGE'] = None
+    _client = app.test_client()
+
+def render_pages(urls, output):
+    """Render urls into output; returns [(url, status)]"""
+    if _client is None:
+        _init_worker()
+    results = []
+    for url in urls:
+        response = _client.get(url)
+        if response.status_code == 200:
+            target = os.path.join(output, output_path(url))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp = target + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(response.get_data())
+            os.replace(tmp, target)
+        results.append((url, response.status_code))
+    return results
+
+def mirror_static(output):
+    """Copy new or changed static files; remove ones deleted from static/
+
+    Fingerprinted assets are also written under their hashed names,
+    which is what the exported pages link to.
+    """
+    from assets import hashed_path
+
+    target_root = os.path.join(output, 'static')
+    copied = 0
+    seen = set()
+    for root, _, files in os.walk(STATIC_DIR):
+        rel_root = os.path.relpath(root, STATIC_DIR)
+        for name in files:
+            rel = os.path.normpath(os.path.join(rel_root, name))
+            src = os.path.join(STATIC_DIR, rel)
+            src_stat = os.stat(src)
+            # Precompressed siblings (.gz/.br) follow their asset's hashed name
+            base, suffix = os.path.splitext(rel) if rel.endswith(('.gz', '.br')) else (rel, '')
+            hashed = os.path.normpath(hashed_path(base.replace(os.sep, '/')) + suffix)
+            for dst_rel in {rel, hashed}:
+                seen.add(dst_rel)
+                dst = os.path.join(target_root, dst_rel)
+                try:
+                    dst_stat = os.stat(dst)
+                    if dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime_ns == src_stat.st_mtime_ns:
+                        continue
+                except FileNotFoundError:
+                    pass
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+                copied += 1
+
+    removed = 0
+    for root, _, files in os.walk(target_root):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), target_root)
+            if rel not in seen:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return copied, removed
+
+def _load_state(output):
+    try:
+        with open(os.path.join(output, STATE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _save_state(output, state):
+    path = os.path.join(output, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def freeze(output, jobs=1, full=False):
+    """Export the site into output; returns the number of failed pages"""
+    os.makedirs(output, exist_ok=True)
+    previous = {} if full else _load_state(output)
+    pages = collect_pages()
+
+    stale = sorted(url for url, fingerprint in pages.items() if previous.get(url) != fingerprint)
+    removed = sorted(set(previous) - set(pages))
+
+    results = []
+    if stale:
+        if jobs > 1 and len(stale) > 1:
+            batches = [stale[i::jobs] for i in range(jobs)]
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+                for batch_results in pool.map(render_pages, batches, [output] * len(batches)):
+                    results.extend(batch_results)
+        else:
+            results = render_pages(stale, output)
+
+    state = {url: fingerprint for url, fingerprint in previous.items() if url in pages}
+    failed = []
+    for url, status in results:
+        if status == 200:
+            state[url] = pages[url]
+        else:
+            state.pop(url, None)
+            failed.append((url, status))
+
+    for url in removed:
+        try:
+            os.remove(os.path.join(output, output_path(url)))
+        except FileNotFoundError:
+            pass
+
+    copied, deleted = mirror_static(output)
+    _save_state(output, state)
+
+    print(f"Pages: {len(pages)} total, {len(results) - len(failed)} rendered, "
+          f"{len(pages) - len(stale)} unchanged, {len(removed)} removed")
+    print(f"Static files: {copied} copied, {deleted} removed")
+    for url, status in failed:
+        print(f"  ✗ {url} returned {status}")
+    return len(failed)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the public site as static HTML')
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, 'build'),
+                        help='output directory (default: build/)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of rendering processes')
+    parser.add_argument('--full', action='store_true',
+                        help='ignore the previous export and render every page')
+    args = parser.parse_args()
+
+    import app  # initializes the database
+    sys.exit(1 if freeze(args.output, jobs=max(1, args.jobs), full=args.full) else 0)
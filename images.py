@@ -0,0 +1,164 @@
+"""
+Responsive image derivatives
+Uploaded images are re-encoded at a few fixed widths as WebP and JPEG
+(EXIF and other metadata stripped) so pages never ship full-size originals.
+Derivative paths and dimensions are recorded in the image_derivatives table
+and rendered by the responsive_img() template helper as srcset/sizes.
+
+Each image's intrinsic size, dominant colour and a tiny blurred preview are
+recorded in image_metadata at the same time, so responsive_img() can give
+the <img> its dimensions and paint the preview until the image arrives.
+"""
+import base64
+import io
+import os
+
+from flask import url_for
+from markupsafe import Markup, escape
+from PIL import Image, ImageFilter, ImageOps
+
+from database import get_image_derivatives, get_image_metadata, set_image_derivatives, set_image_metadata
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGES_FOLDER = os.path.join(BASE_DIR, 'static', 'images')
+DERIVATIVES_DIR = 'derivatives'  # relative to static/images
+
+DERIVATIVE_WIDTHS = (320, 640, 1280)
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+# Formats we can re-encode without losing anything that matters (e.g. animation)
+SOURCE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+# Formats we can at least measure
+MEASURABLE_EXTENSIONS = SOURCE_EXTENSIONS | {'gif'}
+# Longest side of the inline preview; it is stretched (and so blurred) to fit
+PLACEHOLDER_SIZE = 16
+
+def _extension(image_path):
+    return image_path.rsplit('.', 1)[-1].lower() if '.' in image_path else ''
+
+def is_derivable(image_path):
+    """Whether derivatives can be generated for an image path"""
+    return _extension(image_path) in SOURCE_EXTENSIONS and not image_path.startswith(DERIVATIVES_DIR + '/')
+
+def is_measurable(image_path):
+    """Whether metadata can be recorded for an image path"""
+    return _extension(image_path) in MEASURABLE_EXTENSIONS and not image_path.startswith(DERIVATIVES_DIR + '/')
+
+def _load(image_path):
+    """Decode static/images/<image_path> upright, or None if it can't be read"""
+    try:
+        with Image.open(os.path.join(IMAGES_FOLDER, image_path)) as original:
+            # Apply the EXIF orientation before the metadata is dropped
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (OSError, Image.DecompressionBombError):
+        return None
+    return image
+
+def measure(image):
+    """Width, height, dominant colour and a tiny blurred WebP preview (data: URI) of a decoded image"""
+    rgb = image.convert('RGB')
+    r, g, b = rgb.resize((1, 1), Image.BOX).getpixel((0, 0))
+    preview = rgb.copy()
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BOX)
+    buffer = io.BytesIO()
+    preview.filter(ImageFilter.GaussianBlur(0.8)).save(buffer, 'WEBP', quality=40)
+    return {
+        'width': image.width,
+        'height': image.height,
+        'color': f'#{r:02x}{g:02x}{b:02x}',
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+    }
+
+def record_image_metadata(image_path):
+    """Measure an image under static/images and record it; returns the metadata, or None"""
+    if not is_measurable(image_path):
+        return None
+    image = _load(image_path)
+    if image is None:
+        return None
+    metadata = measure(image)
+    set_image_metadata(image_path, metadata)
+    return metadata
+
+def _target_widths(width):
+    """Fixed widths no wider than the original, plus the original if it is smaller"""
+    widths = {w for w in DERIVATIVE_WIDTHS if w < width}
+    widths.add(min(width, DERIVATIVE_WIDTHS[-1]))
+    return sorted(widths)
+
+def generate_derivatives(image_path):
+    """Create resized copies of static/images/<image_path> and record them.
+
+    Returns the list of derivative dicts, or [] if the image can't be processed.
+    """
+    if not is_derivable(image_path):
+        return []
+
+    stem = os.path.splitext(image_path)[0]
+    derivatives = []
+    image = _load(image_path)
+    if image is None:
+        return []
+    # Measured while the image is decoded anyway
+    set_image_metadata(image_path, measure(image))
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    for width in _target_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS) if width != image.width else image
+        for fmt, (pil_format, options) in DERIVATIVE_FORMATS.items():
+            if pil_format == 'JPEG' or not has_alpha:
+                frame = resized.convert('RGB')
+            else:
+                frame = resized.convert('RGBA')
+            rel_path = f"{DERIVATIVES_DIR}/{stem}-{width}.{'jpg' if fmt == 'jpeg' else fmt}"
+            target = os.path.join(IMAGES_FOLDER, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Saving without exif=/icc_profile= leaves the metadata out
+            frame.save(target, pil_format, **options)
+            derivatives.append({'format': fmt, 'width': width, 'height': height, 'path': rel_path})
+
+    set_image_derivatives(image_path, derivatives)
+    return derivatives
+
+def _srcset(rows):
+    return ', '.join(
+        f"{url_for('static', filename='images/' + row['path'])} {row['width']}w" for row in rows
+    )
+
+def responsive_img(image_path, alt='', sizes='100vw', **attrs):
+    """Template helper: <picture> with WebP/JPEG srcsets for an image.
+
+    Falls back to a plain <img> for images without derivatives.
+    Extra keyword arguments become attributes on the <img> (class_ -> class),
+    e.g. loading='lazy'. Measured images get width/height (so their box is
+    reserved) and their blurred preview as a background until they load.
+    """
+    metadata = get_image_metadata(image_path)
+    if metadata:
+        attrs.setdefault('style', f"background: {metadata['color']} url({metadata['placeholder']}) center / cover no-repeat")
+    extra = ''.join(
+        f' {escape(name.rstrip("_").replace("_", "-"))}="{escape(value)}"'
+        for name, value in attrs.items() if value is not None
+    )
+    src = url_for('static', filename='images/' + image_path)
+    derivatives = get_image_derivatives(image_path)
+    if not derivatives.get('jpeg'):
+        size = f' width="{metadata["width"]}" height="{metadata["height"]}"' if metadata else ''
+        return Markup(f'<img src="{escape(src)}"{size} alt="{escape(alt)}"{extra}>')
+
+    jpeg = derivatives['jpeg']
+    largest = jpeg[-1]
+    html = ['<picture>']
+    if derivatives.get('webp'):
+        html.append(f'<source type="image/webp" srcset="{escape(_srcset(derivatives["webp"]))}" sizes="{escape(sizes)}">')
+    fallback = url_for('static', filename='images/' + largest['path'])
+    html.append(
+        f'<img src="{escape(fallback)}" srcset="{escape(_srcset(jpeg))}" sizes="{escape(sizes)}" '
+        f'width="{largest["width"]}" height="{largest["height"]}" alt="{escape(alt)}"{extra}>'
+    )
+    html.append('</picture>')
+    return Markup(''.join(html))
@@ -0,0 +1,170 @@
+"""
+Background jobs
+Slow post-upload work (image derivatives, README rendering) runs here
+instead of in the admin request. Jobs are stored in the jobs table so
+they survive restarts, and are executed by a small local thread pool.
+
+Set JOB_WORKERS=0 to disable the in-process pool (e.g. on hosts that
+don't allow threads in web workers) and drain the queue with:
+    python jobs.py
+"""
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from database import get_db_connection, get_image_derivatives, get_image_metadata, set_project_processing_status
+from images import generate_derivatives, record_image_metadata
+from markdown_render import render_projects
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+# A job still 'running' after this long was owned by a worker that died
+STALE_JOB_SECONDS = 15 * 60
+
+JOB_HANDLERS = {}
+_executor = None
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+    def decorator(f):
+        JOB_HANDLERS[kind] = f
+        return f
+    return decorator
+
+def _get_executor():
+    global _executor
+    if _executor is None and JOB_WORKERS > 0:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+    return _executor
+
+def enqueue(kind, **payload):
+    """Persist a job and hand it to the worker pool; returns the job id"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    conn = get_db_connection()
+    cursor = conn.execute(
+        'INSERT INTO jobs (kind, payload) VALUES (?, ?)',
+        (kind, json.dumps(payload))
+    )
+    conn.commit()
+    job_id = cursor.lastrowid
+    executor = _get_executor()
+    if executor is not None:
+        executor.submit(run_job, job_id)
+    return job_id
+
+def run_job(job_id):
+    """Claim and run a queued job; returns True if it ran successfully"""
+    conn = get_db_connection()
+    # Claiming is atomic, so several processes can share one queue
+    claimed = conn.execute(
+        '''UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+           WHERE id = ? AND status = 'queued' ''',
+        (job_id,)
+    ).rowcount
+    conn.commit()
+    if not claimed:
+        return False
+
+    job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    try:
+        JOB_HANDLERS[job['kind']](**json.loads(job['payload']))
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (traceback.format_exc(limit=5), job_id)
+        )
+        conn.commit()
+        _on_failure(job)
+        return False
+
+    conn.execute(
+        "UPDATE jobs SET status = 'done', error = NULL, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (job_id,)
+    )
+    conn.commit()
+    return True
+
+def _on_failure(job):
+    payload = json.loads(job['payload'])
+    if 'project_id' in payload:
+        set_project_processing_status(payload['project_id'], 'failed')
+
+def requeue_stale_jobs():
+    """Put jobs abandoned by a dead worker back in the queue"""
+    conn = get_db_connection()
+    cutoff = (f'-{STALE_JOB_SECONDS} seconds',)
+    # Check first so that a normal worker start doesn't take the write lock
+    stale = conn.execute(
+        "SELECT 1 FROM jobs WHERE status = 'running' AND updated_at < datetime('now', ?) LIMIT 1",
+        cutoff
+    ).fetchone()
+    if not stale:
+        return
+    conn.execute(
+        '''UPDATE jobs SET status = 'queued'
+           WHERE status = 'running' AND updated_at < datetime('now', ?)''',
+        cutoff
+    )
+    conn.commit()
+
+def queued_job_ids():
+    conn = get_db_connection()
+    rows = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id").fetchall()
+    return [row['id'] for row in rows]
+
+def resume_pending_jobs():
+    """Submit jobs left over from a previous run to the worker pool"""
+    executor = _get_executor()
+    if executor is None:
+        return
+    requeue_stale_jobs()
+    for job_id in queued_job_ids():
+        executor.submit(run_job, job_id)
+
+def drain():
+    """Run every queued job in this process; returns (succeeded, failed)"""
+    requeue_stale_jobs()
+    succeeded = failed = 0
+    for job_id in queued_job_ids():
+        if run_job(job_id):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+def get_job_counts():
+    """Get {status: count} for the dashboard"""
+    conn = get_db_connection()
+    rows = conn.execute('SELECT status, COUNT(*) AS count FROM jobs GROUP BY status').fetchall()
+    return {row['status']: row['count'] for row in rows}
+
+@job_handler('process_project')
+def process_project(project_id, images=(), render_markdown=False):
+    """Post-upload processing for a project: derivatives and README rendering"""
+    for image_path in images:
+        # Identical uploads share a blob, and so its derivatives
+        if not get_image_derivatives(image_path):
+            generate_derivatives(image_path)
+        # Measured along with the derivatives, except for images that have none (GIFs)
+        if not get_image_metadata(image_path):
+            record_image_metadata(image_path)
+
+    if render_markdown:
+        render_projects([project_id])
+
+    set_project_processing_status(project_id, 'ready')
+
+@job_handler('generate_derivatives')
+def generate_derivatives_job(image_path):
+    generate_derivatives(image_path)
+
+if __name__ == '__main__':
+    from database import init_db
+    init_db()
+    succeeded, failed = drain()
+    print(f"Jobs: {succeeded} done, {failed} failed")
+    sys.exit(1 if failed else 0)
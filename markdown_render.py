@@ -0,0 +1,170 @@
+"""
+README markdown rendering
+A project's README markdown is kept in projects.readme_markdown and its
+HTML in full_description. Rendered HTML is also cached in the
+rendered_markdown table under a hash of the markdown source plus the
+renderer configuration (extensions, their settings and library versions),
+so the same input is never rendered twice, and changing the configuration
+makes every README stale at once.
+
+Stale READMEs are re-rendered lazily the first time their project page is
+viewed, or all at once across a process pool with:
+    python markdown_render.py [--jobs N] [--import-readmes]
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import markdown
+
+from database import (
+    get_markdown_projects, get_rendered_markdown, prune_rendered_markdown,
+    set_projects_rendered_markdown, store_rendered_markdown,
+)
+
+try:
+    import pygments
+except ImportError:
+    pygments = None
+
+MARKDOWN_EXTENSIONS = ['extra', 'codehilite', 'fenced_code']
+MARKDOWN_EXTENSION_CONFIGS = {}
+
+# Everything besides the source that changes the HTML
+RENDERER_CONFIG = json.dumps({
+    'extensions': MARKDOWN_EXTENSIONS,
+    'extension_configs': MARKDOWN_EXTENSION_CONFIGS,
+    'markdown': markdown.__version__,
+    'pygments': pygments.__version__ if pygments else None,
+}, sort_keys=True)
+
+# render key -> lock held while that source renders; other sources render in parallel
+_render_locks = {}
+_render_locks_lock = threading.Lock()
+
+def render_key(source):
+    """Cache key of a markdown source under the current renderer config"""
+    h = hashlib.sha256(RENDERER_CONFIG.encode('utf-8'))
+    h.update(b'\0')
+    h.update(source.encode('utf-8'))
+    return h.hexdigest()
+
+def render_html(source):
+    """Render markdown to HTML, without caching"""
+    return markdown.markdown(
+        source, extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_EXTENSION_CONFIGS
+    )
+
+def render_cached(source):
+    """Get (key, html) for a markdown source, rendering only on a cache miss"""
+    key = render_key(source)
+    html = get_rendered_markdown(key)
+    if html is None:
+        # Concurrent requests for the same README wait for one render
+        with _render_locks_lock:
+            lock = _render_locks.setdefault(key, threading.Lock())
+        with lock:
+            html = get_rendered_markdown(key)
+            if html is None:
+                html = render_html(source)
+                store_rendered_markdown([(key, html)])
+        with _render_locks_lock:
+            # Later callers find the HTML in the cache
+            _render_locks.pop(key, None)
+    return key, html
+
+def is_stale(project):
+    """Whether a project's full_description is out of date with its markdown"""
+    return bool(project['readme_markdown']) and project['markdown_key'] != render_key(project['readme_markdown'])
+
+def ensure_rendered(project):
+    """Re-render a project's README if stale; returns the HTML to show, or None if current"""
+    if not is_stale(project):
+        return None
+    key, html = render_cached(project['readme_markdown'])
+    set_projects_rendered_markdown([(project['id'], key, html)])
+    return html
+
+def render_projects(project_ids):
+    """Bring the given projects' rendered READMEs up to date"""
+    for project in get_markdown_projects(project_ids):
+        ensure_rendered(project)
+
+def rerender_stale(jobs=None, force=False):
+    """Re-render every stale README, rendering distinct sources in parallel.
+
+    Returns (projects updated, sources rendered).
+    """
+    stale = [p for p in get_markdown_projects() if force or is_stale(p)]
+    if not stale:
+        return 0, 0
+
+    sources = {}
+    for project in stale:
+        sources.setdefault(render_key(project['readme_markdown']), project['readme_markdown'])
+    rendered = {}
+    if not force:
+        for key in sources:
+            html = get_rendered_markdown(key)
+            if html is not None:
+                rendered[key] = html
+    missing = [key for key in sources if key not in rendered]
+
+    if missing:
+        if jobs == 1 or len(missing) == 1:
+            htmls = [render_html(sources[key]) for key in missing]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                htmls = list(pool.map(render_html, [sources[key] for key in missing], chunksize=4))
+        rendered.update(zip(missing, htmls))
+        store_rendered_markdown([(key, rendered[key]) for key in missing])
+
+    set_projects_rendered_markdown([
+        (project['id'], render_key(project['readme_markdown']), rendered[render_key(project['readme_markdown'])])
+        for project in stale
+    ])
+    return len(stale), len(missing)
+
+def readme_filename(title):
+    """Name the admin upload gave a project's README file in static/readme/"""
+    from werkzeug.utils import secure_filename
+    return secure_filename(f"{title.replace(' ', '_')}_README.md")
+
+def import_readme_files():
+    """Attach README files left in static/readme/ to projects without markdown source.
+
+    Files are matched by the name the admin upload gave them. Returns how many were attached.
+    """
+    from database import get_all_projects, set_project_markdown
+
+    readme_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'readme')
+    attached = 0
+    for project in get_all_projects():
+        if project['readme_markdown']:
+            continue
+        path = os.path.join(readme_folder, readme_filename(project['title']))
+        if os.path.isfile(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                set_project_markdown(project['id'], f.read())
+            attached += 1
+    return attached
+
+if __name__ == '__main__':
+    import argparse
+    from database import init_db
+
+    parser = argparse.ArgumentParser(description='Re-render stale README markdown')
+    parser.add_argument('--jobs', type=int, default=None, help='render processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='re-render everything, ignoring the cache')
+    parser.add_argument('--import-readmes', action='store_true',
+                        help='first attach README files in static/readme/ to projects that have no markdown source')
+    args = parser.parse_args()
+
+    init_db()
+    if args.import_readmes:
+        print(f"Attached {import_readme_files()} README file(s)")
+    updated, rendered = rerender_stale(jobs=args.jobs, force=args.force)
+    pruned = prune_rendered_markdown()
+    print(f"Updated {updated} project(s), rendered {rendered} distinct README(s), pruned {pruned} unused render(s)")
@@ -0,0 +1,208 @@
+"""
+Request metrics
+Per endpoint: request counts by status, latency and response size
+histograms, and the number and total time of SQLite statements run while
+handling the request (counted by database.TimedConnection).
+
+Recording is lock-free: each worker thread aggregates into its own
+counters, which are only merged when metrics are read. Counters of threads
+that have exited (app.run starts one per request) are folded into a
+shared total, so memory stays bounded by the number of live threads. Figures are per
+worker process, like any in-process Prometheus exporter; scrape every
+worker, or sum in Prometheus.
+
+Exposed at /admin/metrics in the Prometheus text format (admin session, or
+"Authorization: Bearer $METRICS_TOKEN" for scrapers) and summarized on the
+admin dashboard.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request, request_finished, request_started
+
+from database import get_category_cache_stats, get_query_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+class EndpointStats:
+    """Counters for one endpoint, owned by one thread"""
+    __slots__ = ('statuses', 'latency', 'latency_sum', 'size', 'size_sum', 'db_queries', 'db_seconds')
+
+    def __init__(self):
+        self.statuses = {}
+        self.latency = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.size = [0] * (len(SIZE_BUCKETS) + 1)
+        self.size_sum = 0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def count(self):
+        return sum(self.latency)
+
+    def merge(self, other):
+        for status, n in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + n
+        self.latency = [a + b for a, b in zip(self.latency, other.latency)]
+        self.latency_sum += other.latency_sum
+        self.size = [a + b for a, b in zip(self.size, other.size)]
+        self.size_sum += other.size_sum
+        self.db_queries += other.db_queries
+        self.db_seconds += other.db_seconds
+
+_local = threading.local()
+_thread_stats = {}  # thread ident -> (thread, its {endpoint: EndpointStats})
+_exited_stats = {}  # {endpoint: EndpointStats} of threads that have exited
+_register_lock = threading.Lock()
+
+def _retire(ident):
+    _, stats = _thread_stats.pop(ident)
+    for endpoint, endpoint_stats in stats.items():
+        _exited_stats.setdefault(endpoint, EndpointStats()).merge(endpoint_stats)
+
+def _sweep():
+    """Fold the counters of exited threads into _exited_stats; hold _register_lock"""
+    for ident, (thread, _) in list(_thread_stats.items()):
+        if not thread.is_alive():
+            _retire(ident)
+
+def _stats_for(endpoint):
+    stats = getattr(_local, 'stats', None)
+    if stats is None:
+        stats = _local.stats = {}
+        thread = threading.current_thread()
+        # The only lock: once per thread, the first time it records
+        with _register_lock:
+            # Also drops a dead thread that had this (reused) ident
+            _sweep()
+            _thread_stats[thread.ident] = (thread, stats)
+    endpoint_stats = stats.get(endpoint)
+    if endpoint_stats is None:
+        endpoint_stats = stats[endpoint] = EndpointStats()
+    return endpoint_stats
+
+def _request_started(sender, **extra):
+    g._metrics_start = (time.perf_counter(), *get_query_stats())
+
+def _request_finished(sender, response, **extra):
+    start = g.get('_metrics_start')
+    if start is None:
+        return
+    started, queries, seconds = start
+    elapsed = time.perf_counter() - started
+    now_queries, now_seconds = get_query_stats()
+
+    stats = _stats_for(request.endpoint or 'unmatched')
+    stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+    stats.latency[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+    stats.latency_sum += elapsed
+    # Streamed responses (e.g. static files) have no known length
+    size = response.calculate_content_length() or 0
+    stats.size[bisect_left(SIZE_BUCKETS, size)] += 1
+    stats.size_sum += size
+    stats.db_queries += now_queries - queries
+    stats.db_seconds += now_seconds - seconds
+
+def init_app(app):
+    """Record metrics for every request to app (blueprints included)"""
+    request_started.connect(_request_started, app)
+    request_finished.connect(_request_finished, app)
+
+def snapshot():
+    """Merge every thread's counters into {endpoint: EndpointStats}"""
+    merged = {}
+    with _register_lock:
+        _sweep()
+        for endpoint, endpoint_stats in _exited_stats.items():
+            merged.setdefault(endpoint, EndpointStats()).merge(endpoint_stats)
+        live = [stats for _, stats in _thread_stats.values()]
+    for stats in live:
+        # dict.copy() is atomic, so a thread adding an endpoint can't break this
+        for endpoint, endpoint_stats in stats.copy().items():
+            merged.setdefault(endpoint, EndpointStats()).merge(endpoint_stats)
+    return merged
+
+def _quantile(buckets, counts, q):
+    """Estimate a quantile from histogram counts (linear within a bucket)"""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, n in enumerate(counts):
+        if seen + n >= rank and n:
+            lower = buckets[i - 1] if i else 0.0
+            upper = buckets[i] if i < len(buckets) else buckets[-1]
+            return lower + (upper - lower) * (rank - seen) / n
+        seen += n
+    return buckets[-1]
+
+def summary(limit=10):
+    """Busiest endpoints for the dashboard, by total time spent"""
+    rows = []
+    for endpoint, stats in snapshot().items():
+        count = stats.count
+        rows.append({
+            'endpoint': endpoint,
+            'requests': count,
+            'errors': sum(n for status, n in stats.statuses.items() if status >= 500),
+            'avg_ms': stats.latency_sum / count * 1000,
+            'p95_ms': _quantile(LATENCY_BUCKETS, stats.latency, 0.95) * 1000,
+            'avg_kb': stats.size_sum / count / 1024,
+            'avg_queries': stats.db_queries / count,
+            'avg_db_ms': stats.db_seconds / count * 1000,
+            'total_seconds': stats.latency_sum,
+        })
+    rows.sort(key=lambda row: row['total_seconds'], reverse=True)
+    return rows[:limit]
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _histogram(lines, name, help_text, buckets, endpoint_counts):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for endpoint, counts, total in endpoint_counts:
+        cumulative = 0
+        for bound, n in zip(buckets + ('+Inf',), counts):
+            cumulative += n
+            lines.append(f'{name}_bucket{{endpoint="{_label(endpoint)}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{endpoint="{_label(endpoint)}"}} {total}')
+        lines.append(f'{name}_count{{endpoint="{_label(endpoint)}"}} {cumulative}')
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    from page_cache import get_page_cache_stats
+
+    stats = sorted(snapshot().items())
+    lines = [
+        '# HELP portfolio_http_requests_total Requests handled, by endpoint and status code.',
+        '# TYPE portfolio_http_requests_total counter',
+    ]
+    for endpoint, s in stats:
+        for status, n in sorted(s.statuses.items()):
+            lines.append(f'portfolio_http_requests_total{{endpoint="{_label(endpoint)}",status="{status}"}} {n}')
+
+    _histogram(lines, 'portfolio_http_request_duration_seconds', 'Time to handle a request.',
+               LATENCY_BUCKETS, [(e, s.latency, s.latency_sum) for e, s in stats])
+    _histogram(lines, 'portfolio_http_response_size_bytes', 'Response body size (0 if streamed).',
+               SIZE_BUCKETS, [(e, s.size, s.size_sum) for e, s in stats])
+
+    lines.append('# HELP portfolio_db_queries_total SQLite statements run while handling requests.')
+    lines.append('# TYPE portfolio_db_queries_total counter')
+    for endpoint, s in stats:
+        lines.append(f'portfolio_db_queries_total{{endpoint="{_label(endpoint)}"}} {s.db_queries}')
+    lines.append('# HELP portfolio_db_query_seconds_total Time spent in SQLite statements while handling requests.')
+    lines.append('# TYPE portfolio_db_query_seconds_total counter')
+    for endpoint, s in stats:
+        lines.append(f'portfolio_db_query_seconds_total{{endpoint="{_label(endpoint)}"}} {s.db_seconds}')
+
+    for cache, cache_stats in (('page', get_page_cache_stats()), ('category', get_category_cache_stats())):
+        for result in ('hits', 'misses'):
+            lines.append(f'# TYPE portfolio_{cache}_cache_{result}_total counter')
+            lines.append(f'portfolio_{cache}_cache_{result}_total {cache_stats[result]}')
+    return '\n'.join(lines) + '\n'
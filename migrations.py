@@ -0,0 +1,347 @@
+"""
+Versioned schema migrations
+The schema version is stored in the database header (PRAGMA user_version).
+Starting a worker only reads it; migrations run when it is behind the
+newest migration below, all in one write transaction, with the version
+re-checked under the write lock so workers starting together migrate once.
+
+Migrations 1-11 used to run ad hoc at every startup (CREATE ... IF NOT
+EXISTS and column probes) before versioning existed, so they stay
+idempotent: databases from that time start at version 0 and pass through
+them without changes.
+
+To change the schema, append a new @migration with the next version number;
+never edit one that has shipped.
+
+Use: python migrations.py        (apply pending migrations, print the version)
+"""
+from database import (
+    get_db_connection, insert_default_categories, rebuild_search_index,
+    sync_project_images, sync_project_tags,
+)
+
+MIGRATIONS = []
+
+def migration(version, description):
+    """Register a function(conn) as the migration to schema version `version`"""
+    def decorator(f):
+        assert not MIGRATIONS or MIGRATIONS[-1][0] == version - 1, 'migrations must be numbered in order'
+        MIGRATIONS.append((version, description, f))
+        return f
+    return decorator
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+def schema_version(conn=None):
+    conn = conn or get_db_connection()
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+def migrate(conn=None):
+    """Apply pending migrations; returns the list of versions applied"""
+    conn = conn or get_db_connection()
+    # Hot path: a single header read when the schema is current
+    if schema_version(conn) >= latest_version():
+        return []
+
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    applied = []
+    try:
+        # Another worker may have migrated while we waited for the lock
+        for version, _, apply in MIGRATIONS:
+            if version > schema_version(conn):
+                apply(conn)
+                conn.execute(f'PRAGMA user_version = {version:d}')
+                applied.append(version)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return applied
+
+@migration(1, 'projects, categories and admin users')
+def _initial_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT,
+            full_description TEXT,
+            technologies TEXT,
+            image_url TEXT,
+            screenshots TEXT,
+            project_url TEXT,
+            github_url TEXT,
+            featured BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            icon TEXT,
+            color TEXT,
+            is_listed BOOLEAN DEFAULT 1,
+            sort_order INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS admin_users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+@migration(2, 'categories.icon_image (formerly migrate_add_icon_image.py)')
+def _category_icon_image(conn):
+    if 'icon_image' not in _columns(conn, 'categories'):
+        conn.execute('ALTER TABLE categories ADD COLUMN icon_image TEXT')
+
+@migration(3, 'listing indexes')
+def _listing_indexes(conn):
+    # Listings are filtered by category and ordered newest first
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_projects_category_created ON projects(category, created_at DESC, id DESC)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at DESC, id DESC)')
+
+@migration(4, 'content_version')
+def _content_version(conn):
+    # Single-row content generation, bumped by every write so that each
+    # worker process can tell when its cached pages are out of date
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS content_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO content_version (id, generation) VALUES (1, 0)')
+
+@migration(5, 'background jobs and projects.processing_status')
+def _jobs(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)')
+    if 'processing_status' not in _columns(conn, 'projects'):
+        conn.execute("ALTER TABLE projects ADD COLUMN processing_status TEXT DEFAULT 'ready'")
+
+@migration(6, 'content-addressed blobs')
+def _blobs(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            path TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_blobs_digest ON blobs(digest)')
+
+@migration(7, 'image derivatives')
+def _image_derivatives(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS image_derivatives (
+            source TEXT NOT NULL,
+            format TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            PRIMARY KEY (source, format, width)
+        )
+    ''')
+
+@migration(8, 'full-text search index')
+def _search_index(conn):
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+            title, description, full_description, technologies,
+            tokenize = 'porter unicode61'
+        )
+    ''')
+    # Triggers keep the index in sync with every writer
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS projects_fts_insert AFTER INSERT ON projects BEGIN
+            INSERT INTO projects_fts (rowid, title, description, full_description, technologies)
+            VALUES (new.id, new.title, new.description, strip_html(new.full_description), new.technologies);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS projects_fts_delete AFTER DELETE ON projects BEGIN
+            DELETE FROM projects_fts WHERE rowid = old.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS projects_fts_update
+        AFTER UPDATE OF title, description, full_description, technologies ON projects BEGIN
+            DELETE FROM projects_fts WHERE rowid = old.id;
+            INSERT INTO projects_fts (rowid, title, description, full_description, technologies)
+            VALUES (new.id, new.title, new.description, strip_html(new.full_description), new.technologies);
+        END
+    ''')
+    indexed = conn.execute('SELECT COUNT(*) FROM projects_fts').fetchone()[0]
+    if indexed != conn.execute('SELECT COUNT(*) FROM projects').fetchone()[0]:
+        rebuild_search_index(conn)
+
+@migration(9, 'normalized tags and screenshots')
+def _tags(conn):
+    # Technologies and screenshots are stored comma-joined on projects (the
+    # admin form edits them that way); these tables hold the same lists
+    # normalized so they can be looked up through an index
+    new_tables = not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'project_tags'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            slug TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS project_tags (
+            project_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (project_id, tag_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_project_tags_tag ON project_tags(tag_id, project_id)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS project_images (
+            project_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            PRIMARY KEY (project_id, position)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_project_images_path ON project_images(path)')
+    if new_tables:
+        # Split the existing comma-joined columns
+        for project in conn.execute('SELECT id, technologies, screenshots FROM projects').fetchall():
+            sync_project_tags(conn, project['id'], project['technologies'])
+            sync_project_images(conn, project['id'], project['screenshots'])
+
+@migration(10, 'README markdown source and render cache')
+def _markdown(conn):
+    # full_description holds the rendering of readme_markdown; markdown_key
+    # identifies the source + renderer it was rendered with
+    columns = _columns(conn, 'projects')
+    if 'readme_markdown' not in columns:
+        conn.execute('ALTER TABLE projects ADD COLUMN readme_markdown TEXT')
+    if 'markdown_key' not in columns:
+        conn.execute('ALTER TABLE projects ADD COLUMN markdown_key TEXT')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS rendered_markdown (
+            key TEXT PRIMARY KEY,
+            html TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+@migration(11, 'default categories')
+def _default_categories(conn):
+    # Previously re-checked at every startup; now seeded once
+    insert_default_categories(conn)
+
+@migration(12, 'projects.updated_at row version')
+def _updated_at(conn):
+    # Set on every change to a project row (NULL until the first one), so
+    # (id, updated_at) identifies a version of the row, e.g. for card caching
+    if 'updated_at' not in _columns(conn, 'projects'):
+        conn.execute('ALTER TABLE projects ADD COLUMN updated_at TIMESTAMP')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS projects_touch AFTER UPDATE ON projects
+        WHEN new.updated_at IS old.updated_at BEGIN
+            UPDATE projects SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = new.id;
+        END
+    ''')
+
+@migration(13, 'projects.sort_order manual ordering')
+def _project_sort_order(conn):
+    # Listings follow sort_order (ascending) instead of created_at, so
+    # projects can be reordered by hand; existing rows keep newest first
+    if 'sort_order' not in _columns(conn, 'projects'):
+        conn.execute('ALTER TABLE projects ADD COLUMN sort_order INTEGER')
+    # Numbered here rather than with UPDATE ... FROM, which needs SQLite 3.33
+    rows = conn.execute('SELECT id, sort_order FROM projects ORDER BY created_at DESC, id DESC').fetchall()
+    conn.executemany(
+        'UPDATE projects SET sort_order = ? WHERE id = ?',
+        [(position, row['id']) for position, row in enumerate(rows, 1) if row['sort_order'] is None]
+    )
+    # New rows go on top unless given a position (one index probe, whoever inserts them)
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS projects_sort_order AFTER INSERT ON projects
+        WHEN new.sort_order IS NULL BEGIN
+            UPDATE projects SET sort_order = (SELECT COALESCE(MIN(sort_order), 1) - 1 FROM projects)
+            WHERE id = new.id;
+        END
+    ''')
+    conn.execute('DROP INDEX IF EXISTS idx_projects_category_created')
+    conn.execute('DROP INDEX IF EXISTS idx_projects_created')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_projects_category_order ON projects(category, sort_order, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_projects_order ON projects(sort_order, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_categories_order ON categories(sort_order)')
+
+@migration(14, 'image metadata for placeholders')
+def _image_metadata(conn):
+    # Intrinsic size, dominant colour and a tiny blurred preview (data: URI)
+    # of each source image, so pages can reserve its box before it loads
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS image_metadata (
+            source TEXT PRIMARY KEY,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            color TEXT NOT NULL,
+            placeholder TEXT
+        )
+    ''')
+
+@migration(15, 'projects.image_url index')
+def _image_url_index(conn):
+    # Lets the orphan collector (and derivative/metadata updates) find the
+    # projects using an image without scanning them all
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_projects_image_url ON projects(image_url)')
+
+@migration(16, 'projects.row_version counter')
+def _row_version(conn):
+    # updated_at is NULL until a row's first update and only has millisecond
+    # resolution, so two writes close together could share a "version".
+    # row_version starts at 1 and goes up by one on every update instead.
+    if 'row_version' not in _columns(conn, 'projects'):
+        conn.execute('ALTER TABLE projects ADD COLUMN row_version INTEGER NOT NULL DEFAULT 1')
+    conn.execute('DROP TRIGGER IF EXISTS projects_touch')
+    conn.execute('''
+        CREATE TRIGGER projects_touch AFTER UPDATE ON projects
+        WHEN new.row_version IS old.row_version BEGIN
+            UPDATE projects SET row_version = old.row_version + 1,
+                                updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+            WHERE id = new.id;
+        END
+    ''')
+
+if __name__ == '__main__':
+    applied = migrate()
+    for version, description, _ in MIGRATIONS:
+        if version in applied:
+            print(f"✓ {version}: {description}")
+    print(f"Schema version {schema_version()} ({len(applied)} migration(s) applied)")
@@ -0,0 +1,233 @@
+"""
+Orphaned upload collection
+Nothing deletes an uploaded file when it stops being used: deleting a
+project, replacing its images or a category's icon, or moving images into
+the blob store all leave the old files behind. This reconciles the upload
+directories against what the database references and removes the rest:
+
+    static/images/projects/, category-icons/, blobs/   project images and icons
+    static/images/derivatives/                         resized copies (see images.py)
+    static/readme/                                     README uploads from before they
+                                                       were stored in the database
+    .uploads/                                          abandoned chunked uploads
+
+Files younger than ORPHAN_GRACE_SECONDS are left alone, so an upload whose
+project form hasn't been submitted yet survives. Directories are walked
+incrementally and orphans are handled in batches of ORPHAN_BATCH_SIZE; each
+batch is re-checked against the database and deleted under the write lock
+(storage.commit_blob takes the same lock), so a file that has just started
+being used again is never removed.
+
+Use: python orphans.py             (dry run: report what would be deleted)
+     python orphans.py --delete
+Set ORPHAN_GC_INTERVAL (seconds) to also run it in a background thread of
+each app process.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+from database import (
+    bump_content_version, get_db_connection, invalidate_image_derivative_cache,
+    invalidate_image_metadata_cache,
+)
+from markdown_render import readme_filename
+from storage import BLOBS_DIR, IMAGES_FOLDER
+from images import DERIVATIVES_DIR
+from uploads import sweep_stale_uploads
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
+# Upload directories, relative to static/images
+IMAGE_DIRS = ('projects', 'category-icons', BLOBS_DIR)
+README_DIR = 'readme'  # relative to static/
+
+ORPHAN_GRACE_SECONDS = int(os.environ.get('ORPHAN_GRACE_SECONDS', str(24 * 60 * 60)))
+ORPHAN_BATCH_SIZE = 500
+ORPHAN_GC_INTERVAL = int(os.environ.get('ORPHAN_GC_INTERVAL', '0'))  # 0 = no background thread
+
+logger = logging.getLogger(__name__)
+
+def _scan(root, relative_to):
+    """Yield (path relative to relative_to, size, mtime) for every file under root.
+
+    Walks one directory at a time, so memory doesn't grow with the tree.
+    Dotfiles (.gitkeep) are never uploads and are skipped.
+    """
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    rel = os.path.relpath(entry.path, relative_to).replace(os.sep, '/')
+                    yield rel, stat.st_size, stat.st_mtime
+
+def referenced_images(conn):
+    """Every static/images path a project or category uses"""
+    paths = set()
+    for row in conn.execute('SELECT image_url, screenshots FROM projects'):
+        paths.add(row['image_url'])
+        paths.update((row['screenshots'] or '').split(','))
+    paths.update(row[0] for row in conn.execute('SELECT icon_image FROM categories'))
+    paths.discard(None)
+    paths.discard('')
+    return paths
+
+def referenced_readmes(conn):
+    """static/-relative README files something may still read"""
+    # markdown_render.import_readme_files attaches these to their projects
+    return {
+        f"{README_DIR}/{readme_filename(row['title'])}"
+        for row in conn.execute('SELECT title FROM projects WHERE readme_markdown IS NULL')
+    }
+
+def _still_used(conn, paths):
+    placeholders = ','.join('?' * len(paths))
+    return {row[0] for row in conn.execute(f'''
+        SELECT image_url FROM projects WHERE image_url IN ({placeholders})
+        UNION SELECT path FROM project_images WHERE path IN ({placeholders})
+        UNION SELECT icon_image FROM categories WHERE icon_image IN ({placeholders})
+    ''', paths * 3)}
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def _delete_images(conn, batch, report):
+    """Delete a batch of unreferenced images with their derivatives and rows"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        used = _still_used(conn, [path for path, _ in batch])
+        batch = [(path, size) for path, size in batch if path not in used]
+        paths = [path for path, _ in batch]
+        if paths:
+            placeholders = ','.join('?' * len(paths))
+            derivatives = [row[0] for row in conn.execute(
+                f'SELECT path FROM image_derivatives WHERE source IN ({placeholders})', paths
+            )]
+            conn.execute(f'DELETE FROM image_derivatives WHERE source IN ({placeholders})', paths)
+            conn.execute(f'DELETE FROM image_metadata WHERE source IN ({placeholders})', paths)
+            conn.execute(f'DELETE FROM blobs WHERE path IN ({placeholders})', paths)
+            # Removed before the commit: commit_blob can't find a copy and
+            # then lose it while we hold the lock
+            for path, size in batch:
+                if _remove(os.path.join(IMAGES_FOLDER, path)):
+                    report['deleted'] += 1
+                    report['freed'] += size
+            for path in derivatives:
+                _remove(os.path.join(IMAGES_FOLDER, path))
+            # Other processes drop their derivative/metadata caches too
+            bump_content_version(conn)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    invalidate_image_derivative_cache()
+    invalidate_image_metadata_cache()
+
+def _delete_files(folder, batch, report):
+    for path, size in batch:
+        if _remove(os.path.join(folder, path)):
+            report['deleted'] += 1
+            report['freed'] += size
+
+def _collect_dir(root, relative_to, referenced, cutoff, delete_batch, on_orphan, report, batch_size):
+    """Count the orphans under root, passing them to delete_batch (if any) batch by batch"""
+    batch = []
+    for path, size, mtime in _scan(root, relative_to):
+        report['scanned'] += 1
+        if path in referenced or mtime > cutoff:
+            continue
+        report['orphans'] += 1
+        report['orphan_bytes'] += size
+        if on_orphan:
+            on_orphan(path, size)
+        batch.append((path, size))
+        if len(batch) >= batch_size:
+            if delete_batch:
+                delete_batch(batch)
+            batch = []
+    if batch and delete_batch:
+        delete_batch(batch)
+
+def collect(delete=False, grace=ORPHAN_GRACE_SECONDS, batch_size=ORPHAN_BATCH_SIZE, on_orphan=None):
+    """Find unreferenced upload files older than grace seconds; remove them if delete.
+
+    Only counts are kept, so memory doesn't grow with the number of
+    orphans; on_orphan(path, size) is called for each one as it is found.
+    Paths are relative to static/images, or to static/ for README files.
+    Returns {'scanned', 'orphans', 'orphan_bytes', 'deleted', 'freed' (bytes),
+    'uploads' (abandoned chunked uploads removed)}.
+    """
+    conn = get_db_connection()
+    cutoff = time.time() - grace
+    report = {'scanned': 0, 'orphans': 0, 'orphan_bytes': 0, 'deleted': 0, 'freed': 0, 'uploads': 0}
+
+    referenced = referenced_images(conn)
+    for folder in IMAGE_DIRS:
+        _collect_dir(os.path.join(IMAGES_FOLDER, folder), IMAGES_FOLDER, referenced, cutoff,
+                     delete and (lambda batch: _delete_images(conn, batch, report)), on_orphan, report, batch_size)
+
+    # Read after the images above (and their derivative rows) are gone
+    derivatives = {row[0] for row in conn.execute('SELECT path FROM image_derivatives')}
+    _collect_dir(os.path.join(IMAGES_FOLDER, DERIVATIVES_DIR), IMAGES_FOLDER, derivatives, cutoff,
+                 delete and (lambda batch: _delete_files(IMAGES_FOLDER, batch, report)), on_orphan, report, batch_size)
+
+    _collect_dir(os.path.join(STATIC_FOLDER, README_DIR), STATIC_FOLDER, referenced_readmes(conn), cutoff,
+                 delete and (lambda batch: _delete_files(STATIC_FOLDER, batch, report)), on_orphan, report, batch_size)
+
+    if delete:
+        report['uploads'] = sweep_stale_uploads()
+    return report
+
+def _run_periodically(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            report = collect(delete=True)
+            logger.info('Orphan collection deleted %d file(s), freeing %d bytes', report['deleted'], report['freed'])
+        except Exception:
+            # Try again next time; a failed batch was rolled back
+            logger.exception('Orphan collection failed')
+
+def start_collector(interval=ORPHAN_GC_INTERVAL):
+    """Run collect(delete=True) every interval seconds in a daemon thread (no-op if interval is 0)"""
+    if interval <= 0:
+        return None
+    thread = threading.Thread(target=_run_periodically, args=(interval,), name='orphans', daemon=True)
+    thread.start()
+    return thread
+
+if __name__ == '__main__':
+    from database import init_db
+
+    parser = argparse.ArgumentParser(description='Remove upload files nothing references')
+    parser.add_argument('--delete', action='store_true', help='delete the orphans (default: only report them)')
+    parser.add_argument('--grace', type=int, default=ORPHAN_GRACE_SECONDS,
+                        help='leave files younger than this many seconds (default: %(default)s)')
+    parser.add_argument('--batch-size', type=int, default=ORPHAN_BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    report = collect(delete=args.delete, grace=args.grace, batch_size=args.batch_size,
+                     on_orphan=lambda path, size: print(f"{'✗' if args.delete else '·'} {path} ({size / 1024:.1f} KB)"))
+    if args.delete:
+        print(f"\nDeleted {report['deleted']} of {report['scanned']} file(s), freeing {report['freed'] / 1024 / 1024:.1f} MB; "
+              f"{report['uploads']} abandoned upload(s) removed")
+    else:
+        print(f"\n{report['orphans']} of {report['scanned']} file(s) unreferenced ({report['orphan_bytes'] / 1024 / 1024:.1f} MB); "
+              f"run with --delete to remove them")
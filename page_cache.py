@@ -0,0 +1,99 @@
+"""
+Rendered page cache for the public views.
+
+Each worker process keeps the rendered HTML of recently requested pages,
+keyed by endpoint, view arguments and query string. Entries are tagged with
+the content generation from the database (see database.get_content_version),
+so a write made by any worker makes every other worker re-render on its
+next request. Responses carry a strong ETag and Last-Modified, and
+conditional GETs are answered with 304 Not Modified.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import g, make_response, request
+
+from database import get_content_version
+
+PAGE_CACHE_MAX_ENTRIES = 512
+
+CachedPage = namedtuple('CachedPage', 'generation body etag mimetype')
+
+_pages = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+# Templates and code only change on deploy, i.e. when the worker restarts
+_started_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+def current_content_version():
+    """Get the content version once per request"""
+    if 'content_version' not in g:
+        g.content_version = get_content_version()
+    return g.content_version
+
+def _last_modified(updated_at):
+    """Last-Modified for a page: the later of the last write and worker start"""
+    if not updated_at:
+        return _started_at
+    changed = datetime.strptime(updated_at, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return max(changed, _started_at)
+
+def _cache_key(kwargs):
+    return (request.endpoint, tuple(sorted(kwargs.items())), request.query_string)
+
+def _store(key, page):
+    with _lock:
+        _pages[key] = page
+        _pages.move_to_end(key)
+        while len(_pages) > PAGE_CACHE_MAX_ENTRIES:
+            _pages.popitem(last=False)
+
+def cached_page(view):
+    """Decorator: serve a public view from the page cache"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(*args, **kwargs)
+
+        generation, updated_at = current_content_version()
+        key = _cache_key(kwargs)
+        page = _pages.get(key)
+
+        if page is not None and page.generation == generation:
+            _stats['hits'] += 1
+            response = make_response(page.body)
+            response.mimetype = page.mimetype
+        else:
+            _stats['misses'] += 1
+            response = make_response(view(*args, **kwargs))
+            # Only cache complete, successful pages
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            body = response.get_data()
+            page = CachedPage(
+                generation,
+                body,
+                hashlib.sha256(body).hexdigest()[:32],
+                response.mimetype,
+            )
+            _store(key, page)
+
+        response.set_etag(page.etag)
+        response.last_modified = _last_modified(updated_at)
+        # Let browsers keep the page but ask us (cheaply) whether it changed
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
+
+def clear_page_cache():
+    """Drop every cached page in this process"""
+    with _lock:
+        _pages.clear()
+
+def get_page_cache_stats():
+    """Get page cache hit/miss counters"""
+    return dict(_stats, entries=len(_pages))
@@ -0,0 +1,60 @@
+// Admin multi-select and drag-and-drop reordering.
+// A reorder sends the new order of the dragged list to /admin/bulk as one
+// operation, which is applied in a single transaction.
+(function () {
+    document.querySelectorAll('.select-all').forEach(toggle => {
+        const form = toggle.form || toggle.closest('form');
+        toggle.addEventListener('change', () => {
+            document.querySelectorAll(`input[name="ids"][form="${form.id}"]`).forEach(box => {
+                box.checked = toggle.checked;
+            });
+        });
+    });
+
+    document.querySelectorAll('[data-reorder]').forEach(container => {
+        const list = container.tBodies ? container.tBodies[0] : container;
+        let dragged = null;
+        let startOrder = null;
+
+        const order = () => Array.from(list.querySelectorAll(':scope > [data-id]'), item => item.dataset.id);
+
+        list.addEventListener('dragstart', event => {
+            dragged = event.target.closest('[data-id]');
+            if (!dragged) return;
+            startOrder = order().join();
+            dragged.classList.add('dragging');
+            event.dataTransfer.effectAllowed = 'move';
+        });
+
+        list.addEventListener('dragover', event => {
+            const over = event.target.closest('[data-id]');
+            if (!dragged || !over || over === dragged) return;
+            event.preventDefault();
+            const box = over.getBoundingClientRect();
+            const after = container.tBodies
+                ? event.clientY > box.top + box.height / 2
+                : event.clientX > box.left + box.width / 2;
+            over.parentNode.insertBefore(dragged, after ? over.nextSibling : over);
+        });
+
+        list.addEventListener('dragend', async () => {
+            if (!dragged) return;
+            dragged.classList.remove('dragging');
+            dragged = null;
+            const ids = order();
+            if (ids.join() === startOrder) return;
+            try {
+                const response = await fetch(container.dataset.bulkUrl, {
+                    method: 'POST',
+                    credentials: 'same-origin',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ operations: [{ op: container.dataset.reorder, ids }] }),
+                });
+                if (!response.ok) throw new Error((await response.json()).error || response.statusText);
+            } catch (error) {
+                alert(`Could not save the new order: ${error.message}`);
+                location.reload();
+            }
+        });
+    });
+})();
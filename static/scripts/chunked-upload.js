@@ -0,0 +1,94 @@
+// Sends the project form's images through the resumable chunked upload API
+// (see uploads.py) before submitting, so large screenshot sets aren't one
+// huge POST and a dropped connection only costs the chunk in flight.
+(function () {
+    const form = document.querySelector('form[data-upload-url]');
+    if (!form || !window.fetch || !window.Blob) return;
+
+    const uploadUrl = form.dataset.uploadUrl;
+    const status = form.querySelector('.upload-status');
+    const MAX_RETRIES = 5;
+    const FIELDS = [['image', 'uploaded_image'], ['screenshots', 'uploaded_screenshots']];
+
+    async function call(url, options) {
+        const response = await fetch(url, Object.assign({ credentials: 'same-origin' }, options));
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok) {
+            const error = new Error(data.error || response.statusText);
+            error.status = response.status;
+            throw error;
+        }
+        return data;
+    }
+
+    function retryable(error) {
+        // Network failures have no status; 409 means we lost track of the offset
+        return !error.status || error.status === 409 || error.status >= 500;
+    }
+
+    async function uploadFile(file, onProgress) {
+        const upload = await call(uploadUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: file.name, size: file.size }),
+        });
+        const url = `${uploadUrl}/${upload.id}`;
+        let offset = 0;
+        let failures = 0;
+        while (offset < file.size) {
+            try {
+                const result = await call(`${url}?offset=${offset}`, {
+                    method: 'PUT',
+                    headers: { 'Content-Type': 'application/octet-stream' },
+                    body: file.slice(offset, offset + upload.chunk_size),
+                });
+                offset = result.offset;
+                failures = 0;
+                onProgress(offset);
+            } catch (error) {
+                if (!retryable(error) || ++failures > MAX_RETRIES) throw error;
+                await new Promise(resolve => setTimeout(resolve, 500 * 2 ** failures));
+                try {
+                    // Resume from whatever the server kept
+                    offset = (await call(url)).offset;
+                } catch (statusError) {
+                    if (!retryable(statusError)) throw statusError;
+                }
+            }
+        }
+        return (await call(`${url}/complete`, { method: 'POST' })).path;
+    }
+
+    form.addEventListener('submit', async event => {
+        const pending = FIELDS
+            .map(([input, hidden]) => [form.elements[input], form.elements[hidden]])
+            .filter(([input]) => input && input.files.length);
+        if (!pending.length) return;
+        event.preventDefault();
+
+        const button = form.querySelector('[type="submit"]');
+        const files = pending.flatMap(([input]) => Array.from(input.files));
+        const total = files.reduce((sum, file) => sum + file.size, 0);
+        let done = 0;
+        button.disabled = true;
+        try {
+            for (const [input, hidden] of pending) {
+                const paths = [];
+                for (const file of input.files) {
+                    paths.push(await uploadFile(file, offset => {
+                        status.textContent = `Uploading ${file.name}… ${Math.floor((done + offset) / total * 100)}%`;
+                    }));
+                    done += file.size;
+                }
+                hidden.value = paths.join(',');
+                // Already stored; don't send the files again with the form
+                input.value = '';
+            }
+            status.textContent = 'Saving…';
+            form.submit();
+        } catch (error) {
+            status.textContent = `Upload failed: ${error.message}`;
+            button.disabled = false;
+        }
+    });
+})();
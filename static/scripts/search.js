@@ -0,0 +1,54 @@
+// Live project search on the portfolio page (results from /api/search)
+
+document.addEventListener('DOMContentLoaded', function() {
+    const form = document.querySelector('.project-search');
+    if (!form) return;
+    
+    const input = form.querySelector('input[name="q"]');
+    const results = document.querySelector('.search-results');
+    const projectUrl = id => form.dataset.projectUrl.replace(/0$/, id);
+    let timer = null;
+    let controller = null;
+    
+    function render(data) {
+        if (!data.total) {
+            results.innerHTML = '<p class="search-empty">No projects found.</p>';
+            return;
+        }
+        // title_html and snippet_html are escaped server-side apart from <mark>
+        results.innerHTML = data.results.map(project => `
+            <a class="search-result" href="${projectUrl(project.id)}">
+                <h3>${project.title_html}</h3>
+                <p>${project.snippet_html}</p>
+            </a>
+        `).join('');
+    }
+    
+    function search() {
+        const query = input.value.trim();
+        if (controller) controller.abort();
+        if (!query) {
+            results.hidden = true;
+            results.innerHTML = '';
+            return;
+        }
+        
+        controller = new AbortController();
+        const url = `${form.dataset.endpoint}?q=${encodeURIComponent(query)}`;
+        fetch(url, { signal: controller.signal })
+            .then(response => response.json())
+            .then(data => {
+                render(data);
+                results.hidden = false;
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') console.error('Search failed:', error);
+            });
+    }
+    
+    // Wait for a pause in typing before querying
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(search, 200);
+    });
+});
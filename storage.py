@@ -0,0 +1,197 @@
+"""
+Content-addressed upload storage
+Uploaded images are stored once under the SHA-256 digest of their bytes,
+at static/images/blobs/<2 hex chars>/<digest>.<ext>. Identical uploads share
+one file, names can never collide, and because a blob URL can never point
+at different bytes it is served with a far-future immutable Cache-Control.
+
+The blobs table keeps a reference count per blob; database.py adjusts it
+whenever a project or category starts or stops pointing at a blob path.
+
+Use: python storage.py
+    Moves images already referenced by projects/categories into the blob
+    store, deduplicating identical files.
+"""
+import errno
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from werkzeug.utils import secure_filename
+
+from database import get_db_connection, register_blob, sync_project_images
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGES_FOLDER = os.path.join(BASE_DIR, 'static', 'images')
+BLOBS_DIR = 'blobs'  # relative to static/images
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+def is_blob_path(image_path):
+    """Whether a static/images path points into the blob store"""
+    return bool(image_path) and image_path.startswith(BLOBS_DIR + '/')
+
+def _extension(filename):
+    ext = os.path.splitext(secure_filename(filename or ''))[1].lower()
+    return '.jpg' if ext == '.jpeg' else ext
+
+def store_stream(stream, filename):
+    """Stream bytes into the blob store; returns the static/images-relative path"""
+    blobs_root = os.path.join(IMAGES_FOLDER, BLOBS_DIR)
+    os.makedirs(blobs_root, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    # Temp file in the same filesystem so the final move is an atomic rename
+    fd, tmp_path = tempfile.mkstemp(dir=blobs_root, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return commit_blob(tmp_path, digest.hexdigest(), size, filename)
+
+def commit_blob(tmp_path, hexdigest, size, filename):
+    """Move a fully written temp file into the blob store; returns the static/images-relative path.
+
+    tmp_path should be on the same filesystem as the blob store, so the move
+    is an atomic rename; the temp file is gone afterwards either way.
+    """
+    rel_path = f"{BLOBS_DIR}/{hexdigest[:2]}/{hexdigest}{_extension(filename)}"
+    target = os.path.join(IMAGES_FOLDER, rel_path)
+    # Hold the write lock from the existence check until the blob is
+    # registered, so the orphan collector (orphans.py) can't delete an
+    # existing copy in between
+    conn = get_db_connection()
+    locked = not conn.in_transaction
+    if locked:
+        conn.execute('BEGIN IMMEDIATE')
+    try:
+        if os.path.exists(target):
+            # Same bytes already stored; it counts as a new upload for the
+            # collector's grace period
+            os.utime(target)
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.chmod(tmp_path, 0o644)
+            try:
+                os.replace(tmp_path, target)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # Different filesystem: copy next to the target, then rename
+                shutil.copyfile(tmp_path, target + '.tmp')
+                os.replace(target + '.tmp', target)
+                os.remove(tmp_path)
+    except BaseException:
+        if locked:
+            conn.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Commits, releasing the lock
+    register_blob(hexdigest, rel_path, size)
+    return rel_path
+
+def store_upload(file):
+    """Store a werkzeug FileStorage upload; returns the static/images-relative path"""
+    return store_stream(file.stream, file.filename)
+
+def immutable_blob_headers(response):
+    """after_request hook: let browsers and CDNs cache blob URLs forever"""
+    from flask import request
+    filename = (request.view_args or {}).get('filename', '')
+    if request.endpoint == 'static' and response.status_code == 200 \
+            and filename.startswith(f'images/{BLOBS_DIR}/'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        response.expires = datetime.now(timezone.utc) + timedelta(seconds=IMMUTABLE_MAX_AGE)
+    return response
+
+def adopt_existing():
+    """Move images referenced by projects/categories into the blob store.
+
+    Returns (references rewritten, new blob paths). Original files are left
+    in place for the orphan collector (orphans.py) to remove.
+    """
+    from database import bump_content_version
+
+    conn = get_db_connection()
+    projects = conn.execute('SELECT id, image_url, screenshots FROM projects').fetchall()
+    categories = conn.execute('SELECT id, icon_image FROM categories').fetchall()
+
+    # Store every referenced file first, then rewrite references in one transaction
+    referenced = set()
+    for project in projects:
+        referenced.add(project['image_url'])
+        referenced.update((project['screenshots'] or '').split(','))
+    referenced.update(category['icon_image'] for category in categories)
+
+    stored = {}
+    for path in referenced:
+        if path and not is_blob_path(path) and os.path.isfile(os.path.join(IMAGES_FOLDER, path)):
+            with open(os.path.join(IMAGES_FOLDER, path), 'rb') as f:
+                stored[path] = store_stream(f, path)
+
+    def adopt(path):
+        return stored.get(path, path)
+
+    rewritten = 0
+    for project in projects:
+        image_url = adopt(project['image_url'])
+        screenshots = ','.join(adopt(s) for s in (project['screenshots'] or '').split(',') if s)
+        if image_url != project['image_url'] or screenshots != (project['screenshots'] or ''):
+            conn.execute(
+                'UPDATE projects SET image_url = ?, screenshots = ? WHERE id = ?',
+                (image_url, screenshots, project['id'])
+            )
+            sync_project_images(conn, project['id'], screenshots)
+            rewritten += 1
+    for category in categories:
+        icon_image = adopt(category['icon_image'])
+        if icon_image != category['icon_image']:
+            conn.execute('UPDATE categories SET icon_image = ? WHERE id = ?', (icon_image, category['id']))
+            rewritten += 1
+
+    # Recount every blob from scratch rather than adjusting per row
+    recount_blob_refs(conn)
+    if rewritten:
+        bump_content_version(conn)
+    conn.commit()
+    return rewritten, sorted(set(stored.values()))
+
+def recount_blob_refs(conn):
+    """Recompute blobs.ref_count from every project and category reference"""
+    counts = {}
+    for project in conn.execute('SELECT image_url, screenshots FROM projects').fetchall():
+        for path in [project['image_url']] + (project['screenshots'] or '').split(','):
+            if is_blob_path(path):
+                counts[path] = counts.get(path, 0) + 1
+    for category in conn.execute('SELECT icon_image FROM categories').fetchall():
+        if is_blob_path(category['icon_image']):
+            counts[category['icon_image']] = counts.get(category['icon_image'], 0) + 1
+    conn.execute('UPDATE blobs SET ref_count = 0')
+    conn.executemany('UPDATE blobs SET ref_count = ? WHERE path = ?', [(n, p) for p, n in counts.items()])
+
+if __name__ == '__main__':
+    from database import init_db
+    from images import generate_derivatives
+
+    init_db()
+    rewritten, new_blobs = adopt_existing()
+    for path in new_blobs:
+        generate_derivatives(path)
+    print(f"Rewrote {rewritten} project/category image reference(s) into {len(new_blobs)} blob(s)")
@@ -0,0 +1,115 @@
+"""
+Template compilation and layout fragment caches
+Compiled templates are kept as bytecode in .jinja-cache/, so a recycled
+worker loads them instead of parsing and compiling every template again,
+and all templates are loaded at startup rather than on their first
+request. The cache is keyed on each template's source, so edited templates
+are recompiled automatically. To fill it ahead of a deploy:
+    python template_cache.py
+
+The parts of base.html that never change between requests (navbar, footer,
+asset links) live in templates/partials/ and are rendered once per worker
+for each combination of their arguments, through layout_fragment().
+
+Listing cards (category/tag pages, admin dashboard rows) are cached per
+project and row version: project_cards() reuses a card's HTML until the
+project's row_version changes, so a listing page only renders the cards
+edited since it was last shown.
+"""
+import os
+import time
+from datetime import datetime
+
+from flask import current_app, request
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from database import get_project_tags
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BYTECODE_CACHE_DIR = os.path.join(BASE_DIR, '.jinja-cache')
+CARD_CACHE_MAX_ENTRIES = 10000
+
+_fragments = {}
+_cards = {}  # (partial, project id) -> (row version, html)
+_year = (None, 0.0)  # (current year, timestamp when it ends)
+
+def current_year():
+    """The current year, re-read from the clock only once it has ended"""
+    global _year
+    year, ends_at = _year
+    if time.time() >= ends_at:
+        year = datetime.now().year
+        _year = (year, datetime(year + 1, 1, 1).timestamp())
+    return year
+
+def layout_fragment(name, /, **context):
+    """Template global: render templates/partials/<name>.html, cached by its arguments"""
+    env = current_app.jinja_env
+    key = (name, request.script_root, current_year(), tuple(sorted(context.items())))
+    html = _fragments.get(key)
+    # Templates reload in debug mode; so do fragments
+    if html is None or env.auto_reload:
+        template = env.get_template(f'partials/{name}.html')
+        html = _fragments[key] = Markup(template.render(current_year=key[2], **context).strip())
+    return html
+
+def project_cards(name, projects):
+    """Template global: templates/partials/<name>.html rendered for each project row, joined.
+
+    The partial gets `project` and its `tags`. Rows must include row_version;
+    only cards whose row changed since they were cached are rendered.
+    """
+    env = current_app.jinja_env
+    script_root = request.script_root
+    html = []
+    missing = []
+    for project in projects:
+        cached = _cards.get((name, project['id']))
+        if cached is not None and cached[0] == (project['row_version'], script_root) and not env.auto_reload:
+            html.append(cached[1])
+        else:
+            html.append(None)
+            missing.append(len(html) - 1)
+
+    if missing:
+        template = env.get_template(f'partials/{name}.html')
+        tags = get_project_tags(projects[i]['id'] for i in missing)
+        for i in missing:
+            project = projects[i]
+            card = html[i] = template.render(project=project, tags=tags[project['id']]).strip()
+            if len(_cards) >= CARD_CACHE_MAX_ENTRIES:
+                # Only reached with more projects than entries; start over
+                _cards.clear()
+            _cards[(name, project['id'])] = ((project['row_version'], script_root), card)
+    return Markup('\n'.join(html))
+
+def clear_fragment_cache():
+    """Drop every cached fragment and card in this process"""
+    _fragments.clear()
+    _cards.clear()
+
+def precompile_templates(app):
+    """Load (and compile, if not in the bytecode cache) every template; returns how many"""
+    names = app.jinja_env.list_templates(extensions=('html',))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+def init_app(app):
+    """Persist compiled templates on disk and load them all now"""
+    try:
+        os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(BYTECODE_CACHE_DIR)
+    except OSError:
+        # Read-only deploy: compile in memory as before
+        pass
+    app.add_template_global(layout_fragment)
+    app.add_template_global(project_cards)
+    app.context_processor(lambda: {'current_year': current_year()})
+    precompile_templates(app)
+
+if __name__ == '__main__':
+    from app import app
+
+    print(f"Compiled {precompile_templates(app)} templates into {BYTECODE_CACHE_DIR}")
@@ -0,0 +1,30 @@
+"""Tests run against a scratch database per test, never portfolio.db"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('JOB_WORKERS', '0')
+
+import pytest
+
+import database
+
+def _drop_connection():
+    # close_db_connection() keeps the connection for reuse; tests need a new one per database
+    conn = getattr(database._local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        database._local.conn = None
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A freshly migrated database; yields its connection"""
+    _drop_connection()
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / 'portfolio.db'))
+    database.invalidate_category_cache()
+    database.invalidate_tag_cache()
+    database.init_db()
+    yield database.get_db_connection()
+    _drop_connection()
+    database.invalidate_category_cache()
+    database.invalidate_tag_cache()
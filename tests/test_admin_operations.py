@@ -0,0 +1,76 @@
+import pytest
+
+import database
+
+def _project(title, category='web'):
+    return database.add_project(title, category, '', '', '')
+
+@pytest.mark.parametrize('category', [['web'], {'id': 'web'}, 5, 'no-such-category'])
+def test_move_projects_rejects_invalid_category(db, category):
+    project_id = _project('Site')
+    with pytest.raises(ValueError):
+        database.apply_admin_operations([{'op': 'move_projects', 'ids': [project_id], 'category': category}])
+    assert database.get_project_by_id(project_id)['category'] == 'web'
+
+def test_failed_batch_applies_nothing(db):
+    project_id = _project('Site')
+    with pytest.raises(ValueError):
+        database.apply_admin_operations([
+            {'op': 'feature_projects', 'ids': [project_id]},
+            {'op': 'move_projects', 'ids': [project_id], 'category': ['web']},
+        ])
+    assert database.get_project_by_id(project_id)['featured'] == 0
+
+def _set_sort_orders(db, table, sort_orders):
+    db.executemany(f'UPDATE {table} SET sort_order = ? WHERE id = ?', [(s, i) for i, s in sort_orders.items()])
+    db.commit()
+
+def _order(db, table):
+    return [row[0] for row in db.execute(f'SELECT id FROM {table} ORDER BY sort_order, id')]
+
+def test_keyset_cursors_walk_both_ways(db):
+    ids = [_project(f'Site {n}') for n in range(7)]
+    # Tied sort_orders are ordered by id
+    _set_sort_orders(db, 'projects', dict(zip(ids, [3, 1, 1, 2, 3, 0, 2])))
+    expected = _order(db, 'projects')
+
+    pages, cursor = [], None
+    while True:
+        rows, next_cursor, prev_cursor = database.get_projects_page(after=cursor, limit=3)
+        assert (prev_cursor is None) == (cursor is None)
+        pages.append([row['id'] for row in rows])
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    assert pages == [expected[:3], expected[3:6], expected[6:]]
+
+    rows, next_cursor, prev_cursor = database.get_projects_page(before=prev_cursor, limit=3)
+    assert [row['id'] for row in rows] == expected[3:6]
+    assert next_cursor is not None and prev_cursor is not None
+    rows, next_cursor, prev_cursor = database.get_projects_page(before=prev_cursor, limit=3)
+    assert [row['id'] for row in rows] == expected[:3]
+    assert prev_cursor is None
+    rows, _, _ = database.get_projects_page(after=next_cursor, limit=3)
+    assert [row['id'] for row in rows] == expected[3:6]
+
+def test_reorder_renumbers_shared_slots(db):
+    # Every category in one slot: the two being swapped can't keep apart without a renumber
+    db.execute('UPDATE categories SET sort_order = 1')
+    db.commit()
+    before = _order(db, 'categories')
+    i, j = before.index('java'), before.index('python')
+
+    database.apply_admin_operations([{'op': 'reorder_categories', 'ids': ['python', 'java']}])
+    expected = list(before)
+    expected[i], expected[j] = 'python', 'java'
+    assert _order(db, 'categories') == expected
+    sort_orders = [row[0] for row in db.execute('SELECT sort_order FROM categories')]
+    assert len(set(sort_orders)) == len(sort_orders)
+
+def test_reorder_renumbers_slot_shared_with_another_row(db):
+    a, b, c = _project('A'), _project('B'), _project('C')
+    _set_sort_orders(db, 'projects', {a: 1, b: 2, c: 2})
+
+    database.apply_admin_operations([{'op': 'reorder_projects', 'ids': [b, a]}])
+    assert _order(db, 'projects') == [b, a, c]
+    assert len({row[0] for row in db.execute('SELECT sort_order FROM projects')}) == 3
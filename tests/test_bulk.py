@@ -0,0 +1,42 @@
+import io
+
+import bulk
+
+def _csv(text):
+    return bulk.read_rows(io.StringIO(text), 'csv')
+
+def test_sparse_csv_keeps_existing_values(db):
+    db.execute(
+        "INSERT INTO categories (id, name, icon, is_listed, created_at) VALUES ('games', 'Games', '🎮', 1, '2020-01-02 03:04:05')"
+    )
+    db.execute(
+        "INSERT INTO projects (title, category, description, featured, created_at) "
+        "VALUES ('Chess', 'games', 'Old', 1, '2020-01-02 03:04:05')"
+    )
+    db.commit()
+
+    assert bulk.import_categories(_csv('id,name,icon,is_listed,created_at\ngames,Board games,,,\n')) == (0, 1, [])
+    category = db.execute("SELECT * FROM categories WHERE id = 'games'").fetchone()
+    assert (category['name'], category['icon'], category['is_listed'], category['created_at']) == \
+        ('Board games', '🎮', 1, '2020-01-02 03:04:05')
+
+    assert bulk.import_projects(_csv('title,category,description,featured,created_at\nChess,games,New,,\n')) == (0, 1, [])
+    project = db.execute("SELECT * FROM projects WHERE title = 'Chess'").fetchone()
+    assert (project['description'], project['featured'], project['created_at']) == ('New', 1, '2020-01-02 03:04:05')
+
+def test_sparse_csv_inserts_column_defaults(db):
+    assert bulk.import_categories(_csv('id,name,is_listed,created_at\nmusic,Music,,\n')) == (1, 0, [])
+    category = db.execute("SELECT * FROM categories WHERE id = 'music'").fetchone()
+    assert category['is_listed'] == 1
+    assert category['created_at'] is not None
+
+    assert bulk.import_projects(_csv('title,category,featured,created_at,sort_order\nSynth,music,,,\n')) == (1, 0, [])
+    project = db.execute("SELECT * FROM projects WHERE title = 'Synth'").fetchone()
+    assert project['featured'] == 0
+    assert project['created_at'] is not None
+    assert project['sort_order'] is not None
+
+def test_empty_required_cell_is_reported(db):
+    inserted, updated, errors = bulk.import_categories(_csv('id,name\nmusic,\n'))
+    assert (inserted, updated) == (0, 0)
+    assert errors == [(2, 'missing name')]
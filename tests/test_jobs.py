@@ -0,0 +1,62 @@
+import pytest
+
+import database
+import jobs
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Test job kinds: 'ok' records its payload, 'boom' raises"""
+    calls = []
+    monkeypatch.setitem(jobs.JOB_HANDLERS, 'ok', lambda **payload: calls.append(payload))
+    def boom(**payload):
+        raise RuntimeError('boom')
+    monkeypatch.setitem(jobs.JOB_HANDLERS, 'boom', boom)
+    return calls
+
+def _job(db, job_id):
+    return db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+def test_job_is_claimed_once(db, handlers):
+    job_id = jobs.enqueue('ok', n=1)
+    assert _job(db, job_id)['status'] == 'queued'
+
+    assert jobs.run_job(job_id) is True
+    assert jobs.run_job(job_id) is False
+    job = _job(db, job_id)
+    assert (job['status'], job['attempts']) == ('done', 1)
+    assert handlers == [{'n': 1}]
+
+def test_failed_job_fails_its_project(db, handlers):
+    project_id = database.add_project('Site', 'web', '', '', '')
+    job_id = jobs.enqueue('boom', project_id=project_id)
+
+    assert jobs.run_job(job_id) is False
+    job = _job(db, job_id)
+    assert job['status'] == 'failed'
+    assert 'RuntimeError: boom' in job['error']
+    assert database.get_project_by_id(project_id)['processing_status'] == 'failed'
+
+def test_unknown_kind_is_rejected(db):
+    with pytest.raises(ValueError):
+        jobs.enqueue('no-such-kind')
+
+def test_stale_running_job_is_resumed(db, handlers):
+    stale = jobs.enqueue('ok', n='stale')
+    fresh = jobs.enqueue('ok', n='fresh')
+    db.execute("UPDATE jobs SET status = 'running', updated_at = datetime('now', '-1 hour') WHERE id = ?", (stale,))
+    db.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (fresh,))
+    db.commit()
+
+    jobs.requeue_stale_jobs()
+    assert jobs.queued_job_ids() == [stale]
+    # A job another worker is still running is left alone
+    assert _job(db, fresh)['status'] == 'running'
+
+def test_drain_counts_outcomes(db, handlers):
+    jobs.enqueue('ok', n=1)
+    jobs.enqueue('boom')
+    jobs.enqueue('ok', n=2)
+
+    assert jobs.drain() == (2, 1)
+    assert jobs.queued_job_ids() == []
+    assert jobs.get_job_counts() == {'done': 2, 'failed': 1}
@@ -0,0 +1,20 @@
+import threading
+
+import metrics
+
+def _record(endpoint, times):
+    for _ in range(times):
+        stats = metrics._stats_for(endpoint)
+        stats.latency[0] += 1
+
+def test_exited_threads_are_folded_into_totals():
+    before = metrics.snapshot().get('test.endpoint')
+    before = before.count if before else 0
+    for _ in range(20):
+        thread = threading.Thread(target=_record, args=('test.endpoint', 3))
+        thread.start()
+        thread.join()
+
+    assert metrics.snapshot()['test.endpoint'].count == before + 60
+    # Only live threads keep their own counters
+    assert all(thread.is_alive() for thread, _ in metrics._thread_stats.values())
@@ -0,0 +1,56 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+import storage
+import uploads
+
+# Several storage.CHUNK_SIZE reads long, so an overflow can come after bytes were written
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 1024
+
+@pytest.fixture
+def upload_dirs(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, 'UPLOADS_DIR', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(storage, 'IMAGES_FOLDER', str(tmp_path / 'images'))
+    return tmp_path
+
+def _append(upload_id, offset, data, length=None):
+    return uploads.append_chunk(upload_id, offset, io.BytesIO(data), length)
+
+def test_chunk_at_wrong_offset_is_rejected(upload_dirs):
+    upload_id = uploads.create_upload('shot.png', len(PNG))
+    assert _append(upload_id, 0, PNG[:100]) == 100
+
+    for offset in (0, 50, 200):
+        with pytest.raises(uploads.UploadError) as e:
+            _append(upload_id, offset, PNG[offset:offset + 100])
+        assert e.value.status == 409
+    assert uploads.upload_status(upload_id) == {'offset': 100, 'size': len(PNG)}
+
+def test_declared_oversize_chunk_writes_nothing(upload_dirs):
+    upload_id = uploads.create_upload('shot.png', len(PNG))
+    _append(upload_id, 0, PNG[:100])
+
+    with pytest.raises(uploads.UploadError) as e:
+        _append(upload_id, 100, PNG[100:] + b'extra', length=len(PNG))
+    assert e.value.status == 413
+    assert uploads.upload_status(upload_id)['offset'] == 100
+
+def test_overflowing_chunk_is_cut_back_and_resumable(upload_dirs):
+    upload_id = uploads.create_upload('shot.png', len(PNG))
+    _append(upload_id, 0, PNG[:100])
+
+    # No Content-Length, so the overflow is only seen while streaming
+    with pytest.raises(uploads.UploadError) as e:
+        _append(upload_id, 100, PNG[100:] + b'x')
+    assert e.value.status == 413
+    assert uploads.upload_status(upload_id)['offset'] == 100
+
+    assert _append(upload_id, 100, PNG[100:]) == len(PNG)
+    path = uploads.complete_upload(upload_id)
+    digest = hashlib.sha256(PNG).hexdigest()
+    assert path == f'blobs/{digest[:2]}/{digest}.png'
+    with open(os.path.join(storage.IMAGES_FOLDER, path), 'rb') as f:
+        assert f.read() == PNG
@@ -0,0 +1,221 @@
+"""
+Resumable chunked image uploads
+Large screenshot sets are sent one file at a time, in chunks, instead of in
+one multipart POST capped by MAX_CONTENT_LENGTH:
+
+    POST   /admin/uploads              {"filename", "size"} -> {"id", "offset": 0, "chunk_size"}
+    PUT    /admin/uploads/<id>?offset=N   raw chunk bytes    -> {"offset"}
+    GET    /admin/uploads/<id>                               -> {"offset", "size"} (to resume)
+    POST   /admin/uploads/<id>/complete                      -> {"path"}
+    DELETE /admin/uploads/<id>
+
+Each chunk is streamed from the request straight onto the end of a partial
+file in .uploads/ while being hashed, so nothing is buffered whole. A chunk
+must start where the partial file ends; after a dropped connection the
+client asks for the offset and carries on from there. The image type is
+checked from the file's first bytes (not its name). Completing the upload
+moves the file into the content-addressed blob store (see storage.py) with
+an atomic rename and returns its path for the project form.
+
+Partial uploads not touched for UPLOAD_EXPIRY_SECONDS are deleted.
+"""
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+
+from storage import CHUNK_SIZE, commit_blob
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UPLOADS_DIR = os.path.join(BASE_DIR, '.uploads')
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024   # what clients are told to send
+UPLOAD_MAX_SIZE = 200 * 1024 * 1024   # per file
+UPLOAD_EXPIRY_SECONDS = 24 * 60 * 60
+
+# Leading bytes of the accepted image types -> stored extension
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+SNIFF_BYTES = 12
+
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+# upload id -> (offset, sha256 so far); lets a worker skip re-reading the
+# file at completion when it received every chunk itself
+_hashers = {}
+_locks = {}
+_locks_lock = threading.Lock()
+
+class UploadError(Exception):
+    """A rejected upload request; status is the HTTP status to answer with"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def image_extension(head):
+    """Extension for an image's first bytes, or None if it isn't an accepted type"""
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+def _paths(upload_id):
+    if not _ID_RE.match(upload_id or ''):
+        raise UploadError(404, 'Unknown upload')
+    base = os.path.join(UPLOADS_DIR, upload_id)
+    return base + '.json', base + '.part'
+
+def _lock(upload_id):
+    with _locks_lock:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+def _load(upload_id):
+    meta_path, part_path = _paths(upload_id)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        offset = os.path.getsize(part_path)
+    except (FileNotFoundError, ValueError):
+        raise UploadError(404, 'Unknown upload')
+    return meta, offset
+
+def _discard(upload_id):
+    for path in _paths(upload_id):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    _hashers.pop(upload_id, None)
+    with _locks_lock:
+        _locks.pop(upload_id, None)
+
+def create_upload(filename, size):
+    """Start an upload of `size` bytes; returns its id"""
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError(400, 'size must be a positive integer')
+    if size > UPLOAD_MAX_SIZE:
+        raise UploadError(413, f'Files are limited to {UPLOAD_MAX_SIZE // (1024 * 1024)} MB')
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    sweep_stale_uploads()
+
+    upload_id = secrets.token_hex(16)
+    meta_path, part_path = _paths(upload_id)
+    open(part_path, 'xb').close()
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'filename': str(filename or ''), 'size': size, 'created': time.time()}, f)
+    _hashers[upload_id] = (0, hashlib.sha256())
+    return upload_id
+
+def upload_status(upload_id):
+    """{'offset', 'size'} of an upload in progress"""
+    meta, offset = _load(upload_id)
+    return {'offset': offset, 'size': meta['size']}
+
+def append_chunk(upload_id, offset, stream, length=None):
+    """Append the bytes of stream at offset; returns the new offset.
+
+    length is the chunk's declared size (Content-Length), if known. A chunk
+    is applied whole or not at all: if it turns out too big, the partial
+    file is cut back to offset.
+    """
+    with _lock(upload_id):
+        meta, current = _load(upload_id)
+        if offset != current:
+            raise UploadError(409, f'Expected offset {current}')
+        if length is not None and current + length > meta['size']:
+            raise UploadError(413, 'More data than the declared size')
+        _, part_path = _paths(upload_id)
+
+        hashed_to, hasher = _hashers.get(upload_id, (None, None))
+        if hashed_to != current:
+            # Earlier chunks went to another worker; complete_upload hashes the file instead
+            hasher = hashlib.sha256() if current == 0 else None
+        hashed = hasher.copy() if hasher else None
+        check_type = current < SNIFF_BYTES
+        written = current
+        with open(part_path, 'ab') as part:
+            try:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if written + len(chunk) > meta['size']:
+                        raise UploadError(413, 'More data than the declared size')
+                    part.write(chunk)
+                    written += len(chunk)
+                    if hasher:
+                        hasher.update(chunk)
+            except UploadError:
+                # Keep the file at the offset the client will resume from
+                part.truncate(current)
+                written, hasher = current, hashed
+                raise
+            finally:
+                if hasher:
+                    _hashers[upload_id] = (written, hasher)
+
+        if check_type and (written >= SNIFF_BYTES or written == meta['size']):
+            with open(part_path, 'rb') as part:
+                if image_extension(part.read(SNIFF_BYTES)) is None:
+                    _discard(upload_id)
+                    raise UploadError(415, 'Not a PNG, JPEG, GIF or WebP image')
+        return written
+
+def complete_upload(upload_id):
+    """Move a fully received upload into the blob store; returns its static/images path"""
+    with _lock(upload_id):
+        meta, offset = _load(upload_id)
+        if offset != meta['size']:
+            raise UploadError(409, f'Upload incomplete: {offset} of {meta["size"]} bytes')
+        _, part_path = _paths(upload_id)
+        with open(part_path, 'rb') as part:
+            ext = image_extension(part.read(SNIFF_BYTES))
+        if ext is None:
+            _discard(upload_id)
+            raise UploadError(415, 'Not a PNG, JPEG, GIF or WebP image')
+
+        hashed_to, hasher = _hashers.get(upload_id, (None, None))
+        if hashed_to != offset:
+            # Resumed across workers: hash the file once now
+            hasher = hashlib.sha256()
+            with open(part_path, 'rb') as part:
+                for chunk in iter(lambda: part.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+
+        path = commit_blob(part_path, hasher.hexdigest(), offset, 'upload' + ext)
+        _discard(upload_id)
+        return path
+
+def cancel_upload(upload_id):
+    _paths(upload_id)
+    with _lock(upload_id):
+        _discard(upload_id)
+
+def sweep_stale_uploads(max_age=UPLOAD_EXPIRY_SECONDS):
+    """Delete partial uploads untouched for max_age seconds; returns how many"""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        names = os.listdir(UPLOADS_DIR)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        upload_id, ext = os.path.splitext(name)
+        if ext != '.json' or not _ID_RE.match(upload_id):
+            continue
+        try:
+            _, part_path = _paths(upload_id)
+            touched = max(os.path.getmtime(os.path.join(UPLOADS_DIR, name)), os.path.getmtime(part_path))
+        except FileNotFoundError:
+            touched = 0
+        if touched < cutoff:
+            _discard(upload_id)
+            removed += 1
+    return removed